@@ -52,12 +52,11 @@ def api_generate_report():
         )
 
         if result['success']:
-            # 返回文件路径（相对路径）
-            files = {}
-            for fmt, path in result.get('files', {}).items():
-                # 转换为相对路径
-                rel_path = os.path.relpath(path, project_root)
-                files[fmt] = f"/api/report/download/{os.path.basename(path)}"
+            # 返回下载地址（仅使用文件名）
+            files = {
+                fmt: f"/api/report/download/{os.path.basename(path)}"
+                for fmt, path in result.get('files', {}).items()
+            }
 
             return jsonify({
                 'success': True,
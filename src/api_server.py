@@ -5,54 +5,153 @@
 同域名提供前端数据与 AI 总结/洞察接口
 """
 
+import atexit
+import copy
 import hashlib
+import heapq
 import hmac
 import logging
 import os
+import queue
 import re
+import threading
+import time
+import uuid
 import db
-from collections import defaultdict
-from datetime import datetime, timedelta
-
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache, wraps
+from operator import itemgetter
+
+import orjson
 import requests
 import yaml
-from flask import Flask, jsonify, request, send_file
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, jsonify, render_template, request, send_file
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from report_generator_mailcheck import MailCheckReportGenerator
+
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+
+try:
+    from redis import Redis
+    from rq import Queue
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Job
+    RQ_AVAILABLE = True
+except ImportError:
+    RQ_AVAILABLE = False
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    GUNICORN_AVAILABLE = False
 
 
 logging.basicConfig(level=logging.DEBUG)
 
 
 app = Flask(__name__)
+if COMPRESS_AVAILABLE:
+    # 仅压缩 JSON/HTML 接口响应；报告下载（send_file）需保留 Range/206 与流式输出，不在压缩范围内。
+    # 压缩后 ETag 会追加 ":gzip" 等后缀，需在压缩后重新判断条件请求，304 才能命中
+    app.config.update(
+        COMPRESS_MIMETYPES=["application/json", "text/html"],
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_MIN_SIZE=512,
+        COMPRESS_EVALUATE_CONDITIONAL_REQUEST=True,
+    )
+    Compress(app)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 
 
 def load_config():
-    config_path = os.path.join(project_root, 'config', 'config.yaml')
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return _read_config_file()
 
 
 def _get_config_path():
     return os.path.join(project_root, 'config', 'config.yaml')
 
 
+# 配置文件解析结果按 (mtime, size) 缓存，文件未变时不再重复读取和解析 YAML
+_config_file_cache = {"stat": None, "data": None}
+_config_file_lock = threading.Lock()
+# 优先使用 libyaml 的 C 实现
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
 def _read_config_file():
     config_path = _get_config_path()
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f) or {}
+    st = os.stat(config_path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    with _config_file_lock:
+        if _config_file_cache["stat"] != stat_key:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                _config_file_cache["data"] = yaml.load(f, Loader=_YAML_LOADER) or {}
+            _config_file_cache["stat"] = stat_key
+        # 调用方会修改返回的字典，交出副本
+        return copy.deepcopy(_config_file_cache["data"])
 
 
 def _write_config_file(cfg):
     config_path = _get_config_path()
-    with open(config_path, 'w', encoding='utf-8') as f:
-        yaml.safe_dump(cfg, f, allow_unicode=True, sort_keys=False)
+    with _config_file_lock:
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(cfg, f, Dumper=_YAML_DUMPER, allow_unicode=True, sort_keys=False)
+        # mtime 精度不足时同一时刻的写入可能不改变 stat，直接作废缓存
+        _config_file_cache["stat"] = None
 
 
 config = load_config()
-ai_config = config.get('ai', {})
+ai_config = config.get('ai') or {}
 feedback_config = config.get('feedback', {})
+# 部署在 nginx 等反向代理后时可开启，报告下载改由代理以 sendfile 零拷贝输出
+app.config["USE_X_SENDFILE"] = bool((config.get("api") or {}).get("use_x_sendfile", False))
+
+# AI 接口复用 keep-alive 连接，重试交给连接池适配器统一处理
+_AI_HEADERS = {
+    "Content-Type": "application/json",
+    "Authorization": f"Bearer {ai_config.get('api_key', '')}"
+}
+_AI_SESSION = requests.Session()
+_AI_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=ai_config.get("max_retries", 2),
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+        raise_on_status=False,
+    ),
+))
+_AI_SESSION.mount("http://", _AI_SESSION.get_adapter("https://"))
+# 请求参数启动时读取一次，调用时不再逐项查配置字典
+_AI_URL = ai_config.get("api_url")
+_AI_TIMEOUT = ai_config.get("timeout", 60)
+_AI_SYSTEM_MESSAGE = {"role": "system", "content": "你是专业的舆情分析助手。"}
+_AI_PARAMS = {
+    "model": ai_config.get("model"),
+    "temperature": ai_config.get("temperature", 0.3),
+    "max_tokens": ai_config.get("max_tokens", 800),
+}
+
+# 反馈链接签名密钥，启动时编码一次并预先完成 HMAC 密钥填充，校验时只需 copy
+_LINK_SECRET = (feedback_config.get('link_secret') or '').encode('utf-8')
+_LINK_HMAC = hmac.new(_LINK_SECRET, digestmod=hashlib.sha256) if _LINK_SECRET else None
 _default_cors_origins = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -61,6 +160,39 @@ _default_cors_origins = [
 ]
 CORS_ORIGINS = config.get("runtime", {}).get("cors_origins") or _default_cors_origins
 REPORTS_DIR = os.path.join(project_root, 'data', 'reports')
+REPORTS_REAL_DIR = os.path.realpath(REPORTS_DIR)
+REPORT_FORMATS_BY_EXT = {'.md': 'markdown', '.docx': 'word'}
+_report_generator_local = threading.local()
+REPORT_JOB_TTL_SECONDS = 3600
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+_report_list_cache = {"mtime": None, "body": None, "etag": None}
+_report_list_lock = threading.Lock()
+# 看板轮询接口的短时缓存：同一查询参数在有效期内直接复用已序列化的响应
+API_CACHE_TTL_SECONDS = 30
+API_CACHE_MAX_ENTRIES = 256
+_api_cache = {}
+_api_cache_lock = threading.Lock()
+
+
+def _init_report_queue():
+    # 配置了 Redis 时，异步报告任务交给独立的 RQ worker 进程执行，否则使用本进程线程池
+    queue_cfg = config.get("runtime", {}).get("report_queue") or {}
+    redis_url = queue_cfg.get("redis_url")
+    if not redis_url:
+        return None
+    if not RQ_AVAILABLE:
+        logging.warning("已配置 report_queue.redis_url，但未安装 rq/redis，报告任务仍在本进程执行")
+        return None
+    return Queue(
+        queue_cfg.get("name", "reports"),
+        connection=Redis.from_url(redis_url),
+        default_timeout=queue_cfg.get("job_timeout", 1800),
+    )
+
+
+_report_queue = _init_report_queue()
 
 
 def _normalize_report_format(raw_format: str) -> str:
@@ -69,11 +201,93 @@ def _normalize_report_format(raw_format: str) -> str:
         return "markdown"
     if fmt == "docx":
         return "word"
-    if fmt in ("markdown", "word", "both"):
+    if fmt in ("markdown", "word", "both", "json"):
         return fmt
     return "markdown"
 
 
+def _get_report_generator():
+    # 生成器持有数据库连接，不可跨线程共享；按线程复用实例
+    generator = getattr(_report_generator_local, "generator", None)
+    if generator is None:
+        generator = MailCheckReportGenerator()
+        _report_generator_local.generator = generator
+    return generator
+
+
+def _json_default(obj):
+    # 与 Flask 默认 JSON 行为保持一致，避免接口输出格式变化
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(payload):
+    return orjson.dumps(
+        payload,
+        default=_json_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+def _json_response(payload, status=200):
+    return app.response_class(_json_dumps(payload), status=status, mimetype="application/json")
+
+
+class _OrjsonProvider(DefaultJSONProvider):
+    # jsonify / request.get_json 也走 orjson，序列化规则与 _json_response 一致
+    def dumps(self, obj, **kwargs):
+        return _json_dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_json_dumps(obj), mimetype=self.mimetype)
+
+
+app.json = _OrjsonProvider(app)
+
+
+def _api_cached(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+        now = time.monotonic()
+        with _api_cache_lock:
+            entry = _api_cache.get(key)
+        if entry is None or entry[0] <= now:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+            entry = (now + API_CACHE_TTL_SECONDS, body, response.mimetype, etag)
+            with _api_cache_lock:
+                if len(_api_cache) >= API_CACHE_MAX_ENTRIES:
+                    for stale_key in [k for k, v in _api_cache.items() if v[0] <= now]:
+                        del _api_cache[stale_key]
+                    if len(_api_cache) >= API_CACHE_MAX_ENTRIES:
+                        _api_cache.clear()
+                _api_cache[key] = entry
+
+        response = app.response_class(entry[1], mimetype=entry[2])
+        response.set_etag(entry[3])
+        # 浏览器每次都带 If-None-Match 回源校验，数据未变时返回 304
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return wrapper
+
+
+def _invalidate_api_cache():
+    with _api_cache_lock:
+        _api_cache.clear()
+
+
 @app.after_request
 def add_cors_headers(response):
     origin = request.headers.get("Origin")
@@ -90,15 +304,28 @@ def init_database():
 
 
 def query_db(sql, params=(), fetchone=False):
-    if fetchone:
-        return db.execute(project_root, sql, params, fetchone=True)
-    return db.execute(project_root, sql, params, fetchall=True)
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        if fetchone:
+            return cursor.fetchone()
+        return cursor.fetchall()
 
 
 def _now_local_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def _opinion_content_select(compact, preview_len):
+    # compact 模式只取正文预览和字符长度，避免传输整段长文本
+    if compact:
+        return "SUBSTRING(content, 1, ?) AS content, CHAR_LENGTH(content) AS content_len", (max(preview_len, 0),)
+    return "content", ()
+
+
+_OPINION_SCORES = {"high": 1.0, "medium": 0.6}
+
+
 def row_to_opinion(row, include_content=True, preview_len=240):
     content = row["content"] or ""
     if include_content:
@@ -106,7 +333,9 @@ def row_to_opinion(row, include_content=True, preview_len=240):
         truncated = False
     else:
         content_out = content[:preview_len]
-        truncated = len(content) > preview_len
+        # 列表接口在 SQL 中已截断正文并返回原长度，无需把全文读入 Python
+        content_len = row.get("content_len")
+        truncated = (content_len if content_len is not None else len(content)) > preview_len
     return {
         "id": row["sentiment_id"],
         "rowId": row.get("row_id"),
@@ -116,7 +345,7 @@ def row_to_opinion(row, include_content=True, preview_len=240):
         "content": content_out,
         "reason": row["reason"],
         "severity": row["severity"],
-        "score": 1.0 if row["severity"] == "high" else 0.6 if row["severity"] == "medium" else 0.3,
+        "score": _OPINION_SCORES.get(row["severity"], 0.3),
         "url": row["url"],
         "status": row["status"] or "active",
         "dismissed_at": row["dismissed_at"],
@@ -125,16 +354,26 @@ def row_to_opinion(row, include_content=True, preview_len=240):
     }
 
 
-def get_sentiment_info(sentiment_id):
-    result = query_db(
-        '''
+_SENTIMENT_INFO_SQL = '''
         SELECT hospital_name, title, source, content, reason, severity, url, status, dismissed_at
         FROM negative_sentiments
         WHERE sentiment_id = ?
-        ''',
-        (sentiment_id,),
-        fetchone=True
-    )
+        '''
+_FEEDBACK_LIST_SQL = '''
+        SELECT feedback_time, feedback_type, feedback_text, user_id
+        FROM sentiment_feedback
+        WHERE sentiment_id = ?
+        ORDER BY created_at DESC
+        LIMIT 20
+    '''
+
+
+def get_sentiment_info(sentiment_id):
+    result = query_db(_SENTIMENT_INFO_SQL, (sentiment_id,), fetchone=True)
+    return _sentiment_info_from_row(result)
+
+
+def _sentiment_info_from_row(result):
     if not result:
         return None
     if isinstance(result, dict):
@@ -162,77 +401,79 @@ def get_sentiment_info(sentiment_id):
     }
 
 
+def get_sentiment_bundle(sentiment_id):
+    # 反馈页需要的舆情详情与反馈列表在同一个池化连接上依次查询
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SENTIMENT_INFO_SQL, (sentiment_id,))
+        info = _sentiment_info_from_row(cursor.fetchone())
+        if info is None:
+            return None, []
+        cursor.execute(_FEEDBACK_LIST_SQL, (sentiment_id,))
+        rows = cursor.fetchall()
+    return info, _feedback_items_from_rows(rows)
+
+
 def verify_signature(sentiment_id, sig):
-    secret = feedback_config.get('link_secret', '')
-    if not secret:
+    if _LINK_HMAC is None:
         return False
 
-    message = f"{sentiment_id}".encode('utf-8')
-    expected = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
-    if not hmac.compare_digest(expected, sig or ''):
-        return False
-    return True
+    mac = _LINK_HMAC.copy()
+    mac.update(f"{sentiment_id}".encode('utf-8'))
+    expected = mac.hexdigest().encode('ascii')
+    # 以字节比较，非 ASCII 的 sig 也不会让 compare_digest 抛出 TypeError
+    return hmac.compare_digest(expected, (sig or '').encode('utf-8'))
 
 
 def save_feedback(data):
-    conn = db.connect(project_root)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO sentiment_feedback (
-            sentiment_id, feedback_judgment, feedback_type,
-            feedback_text, user_id, feedback_time, created_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        data['sentiment_id'],
-        data['feedback_judgment'],
-        data['feedback_type'],
-        data['feedback_text'],
-        data['user_id'],
-        _now_local_str(),
-        _now_local_str(),
-    ))
-    feedback_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO sentiment_feedback (
+                sentiment_id, feedback_judgment, feedback_type,
+                feedback_text, user_id, feedback_time, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            data['sentiment_id'],
+            data['feedback_judgment'],
+            data['feedback_type'],
+            data['feedback_text'],
+            data['user_id'],
+            _now_local_str(),
+            _now_local_str(),
+        ))
+        feedback_id = cursor.lastrowid
     return feedback_id
 
 
 def delete_negative_sentiment(sentiment_id):
-    conn = db.connect(project_root)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE negative_sentiments
-        SET status = 'dismissed', dismissed_at = ?
-        WHERE sentiment_id = ?
-    ''', (_now_local_str(), sentiment_id))
-    conn.commit()
-    conn.close()
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE negative_sentiments
+            SET status = 'dismissed', dismissed_at = ?
+            WHERE sentiment_id = ?
+        ''', (_now_local_str(), sentiment_id))
+    _invalidate_api_cache()
 
 
 def restore_negative_sentiment(sentiment_id):
-    conn = db.connect(project_root)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE negative_sentiments
-        SET status = 'active', dismissed_at = NULL
-        WHERE sentiment_id = ?
-    ''', (sentiment_id,))
-    conn.commit()
-    conn.close()
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE negative_sentiments
+            SET status = 'active', dismissed_at = NULL
+            WHERE sentiment_id = ?
+        ''', (sentiment_id,))
+    _invalidate_api_cache()
 
 
 def get_feedback_list(sentiment_id):
-    conn = db.connect(project_root)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT feedback_time, feedback_type, feedback_text, user_id
-        FROM sentiment_feedback
-        WHERE sentiment_id = ?
-        ORDER BY created_at DESC
-        LIMIT 20
-    ''', (sentiment_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    rows = query_db(_FEEDBACK_LIST_SQL, (sentiment_id,))
+    return _feedback_items_from_rows(rows)
+
+
+def _feedback_items_from_rows(rows):
     return [
         {
             'feedback_time': row.get('feedback_time') if isinstance(row, dict) else row[0],
@@ -244,22 +485,27 @@ def get_feedback_list(sentiment_id):
     ]
 
 
+_RULE_KEYWORD_RE = re.compile(r'(关键词|关键字|排除|规则)[:：]\s*(.+)')
+_RULE_QUOTED_RE = re.compile(r'[“"《](.+?)[”"》]')
+_RULE_SPLIT_RE = re.compile(r'[，,、;；\s]+')
+
+
 def extract_rule_candidates(text):
     rules = []
     if not text:
         return rules
 
     explicit_patterns = []
-    keyword_match = re.search(r'(关键词|关键字|排除|规则)[:：]\s*(.+)', text)
+    keyword_match = _RULE_KEYWORD_RE.search(text)
     if keyword_match:
         explicit_patterns.append(keyword_match.group(2))
 
-    quoted = re.findall(r'[“"《](.+?)[”"》]', text)
+    quoted = _RULE_QUOTED_RE.findall(text)
     explicit_patterns.extend(quoted)
 
     candidates = []
     for raw in explicit_patterns:
-        parts = re.split(r'[，,、;；\s]+', raw)
+        parts = _RULE_SPLIT_RE.split(raw)
         for part in parts:
             term = part.strip()
             if 2 <= len(term) <= 20:
@@ -279,23 +525,26 @@ def save_feedback_rules(feedback_id, rules, action):
     if not rules:
         return
 
-    conn = db.connect(project_root)
-    cursor = conn.cursor()
-    for rule in rules:
-        cursor.execute('''
-            INSERT INTO feedback_rules (
-                pattern, rule_type, action, confidence, enabled, source_feedback_id, created_at
-            ) VALUES (?, ?, ?, ?, 1, ?, ?)
-        ''', (
+    created_at = _now_local_str()
+    payload = [
+        (
             rule.get('pattern'),
             rule.get('rule_type', 'keyword'),
             action,
             rule.get('confidence', 0.5),
             feedback_id,
-            _now_local_str(),
-        ))
-    conn.commit()
-    conn.close()
+            created_at,
+        )
+        for rule in rules
+    ]
+    # pymysql 会把 executemany 的 INSERT ... VALUES 改写为单条多行插入，一次往返完成
+    with db.pooled_connection(project_root) as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO feedback_rules (
+                pattern, rule_type, action, confidence, enabled, source_feedback_id, created_at
+            ) VALUES (?, ?, ?, ?, 1, ?, ?)
+        ''', payload)
 
 
 @app.get("/")
@@ -318,6 +567,7 @@ def health():
 
 
 @app.get("/api/opinions")
+@_api_cached
 def list_opinions():
     status = request.args.get("status", "active")
     limit = int(request.args.get("limit", 50))
@@ -329,22 +579,58 @@ def list_opinions():
         f"list_opinions called: status={status}, limit={limit}, offset={offset}, compact={compact}"
     )
 
+    content_select, content_params = _opinion_content_select(compact, preview_len)
     rows = query_db(
-        """
-        SELECT id AS row_id, sentiment_id, hospital_name, title, source, content, reason,
+        f"""
+        SELECT id AS row_id, sentiment_id, hospital_name, title, source, {content_select}, reason,
                severity, url, status, dismissed_at, processed_at
         FROM negative_sentiments
         WHERE (? = 'all' OR COALESCE(NULLIF(status, ''), 'active') = ?)
         ORDER BY processed_at DESC
         LIMIT ? OFFSET ?
         """,
-        (status, status, limit, offset),
+        content_params + (status, status, limit, offset),
     )
     logging.debug(f"Query returned {len(rows)} rows")
-    return jsonify([row_to_opinion(r, include_content=not compact, preview_len=preview_len) for r in rows])
+    return _json_response([row_to_opinion(r, include_content=not compact, preview_len=preview_len) for r in rows])
+
+
+@lru_cache(maxsize=4)
+def _stats_sql(has_start, has_end):
+    # 统计 SQL 只随起止时间是否给定而变化，四种组合各拼装一次
+    time_filters = []
+    dis_filters = []
+    if has_start:
+        time_filters.append("processed_at >= ?")
+        dis_filters.append("dismissed_at >= ?")
+    if has_end:
+        time_filters.append("processed_at <= ?")
+        dis_filters.append("dismissed_at <= ?")
+    active_clause = " AND ".join(time_filters + ["COALESCE(NULLIF(status,''),'active') != 'dismissed'"])
+    dis_clause = " AND ".join(["COALESCE(NULLIF(status,''),'active') = 'dismissed'"] + dis_filters)
+
+    # 医院与来源统计共用一次扫描：按 医院×严重程度×来源 分组，在 Python 中分别折算
+    hospital_sql = f"""
+        SELECT
+            COALESCE(NULLIF(hospital_name,''),'未知') AS hospital,
+            severity,
+            COALESCE(NULLIF(source,''),'未知') AS source,
+            COUNT(*) AS count
+        FROM negative_sentiments
+        WHERE {active_clause}
+        GROUP BY hospital, severity, source
+        ORDER BY hospital
+        """
+    dismissed_sql = f"""
+        SELECT COUNT(*) AS dismissed_total
+        FROM negative_sentiments
+        WHERE {dis_clause}
+        """
+    return hospital_sql, dismissed_sql
 
 
 @app.get("/api/stats")
+@_api_cached
 def get_stats():
     range_key = request.args.get("range", "7d")
     start_date = request.args.get("start_date", "")
@@ -363,140 +649,62 @@ def get_stats():
             start_dt = now - timedelta(days=7)
         end_dt = now
 
-    time_filters = []
     params = []
     if start_dt:
-        time_filters.append("processed_at >= ?")
         params.append(start_dt.strftime("%Y-%m-%d %H:%M:%S"))
     if end_dt:
-        time_filters.append("processed_at <= ?")
         params.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-    time_clause = " AND ".join(time_filters)
-    active_clause = " AND ".join([f for f in [time_clause, "COALESCE(NULLIF(status,''),'active') != 'dismissed'"] if f])
-    time_where = f"WHERE {time_clause}" if time_clause else ""
-    active_where = f"WHERE {active_clause}" if active_clause else ""
-
-    status_expr = "COALESCE(NULLIF(status,''),'active')"
-
-    proc_params = []
-    if start_dt:
-        proc_params.append(start_dt.strftime("%Y-%m-%d %H:%M:%S"))
-    if end_dt:
-        proc_params.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-
-    rows = query_db(
-        f"""
-        SELECT
-            SUM(CASE WHEN {status_expr} != 'dismissed' THEN 1 ELSE 0 END) AS active_total,
-            SUM(CASE WHEN severity = 'high' AND {status_expr} != 'dismissed' THEN 1 ELSE 0 END) AS high_total,
-            SUM(CASE WHEN severity = 'medium' AND {status_expr} != 'dismissed' THEN 1 ELSE 0 END) AS medium_total,
-            SUM(CASE WHEN severity = 'low' AND {status_expr} != 'dismissed' THEN 1 ELSE 0 END) AS low_total,
-            SUM(CASE WHEN {status_expr} != 'dismissed'
-                THEN CASE
-                    WHEN severity = 'high' THEN 0.92
-                    WHEN severity = 'medium' THEN 0.6
-                    ELSE 0.35
-                END
-                ELSE 0 END) AS total_score,
-            SUM(CASE WHEN {status_expr} != 'dismissed' THEN 1 ELSE 0 END) AS score_count
-        FROM negative_sentiments
-        {time_where}
-        """,
-        tuple(proc_params),
-        fetchone=True,
+    hospital_sql, dismissed_sql = _stats_sql(bool(start_dt), bool(end_dt))
+
+    # 单次分组计数，严重程度分布、风险分、医院列表与排行、来源排行均在 Python 中折算
+    hospital_rows = query_db(hospital_sql, tuple(params))
+    severity_counts = {"high": 0, "medium": 0, "low": 0}
+    active_total = 0
+    hospital_items = {}
+    source_counts = {}
+    for r in hospital_rows:
+        item = hospital_items.get(r["hospital"])
+        if item is None:
+            item = {"hospital": r["hospital"], "high": 0, "medium": 0, "low": 0, "total": 0}
+            hospital_items[r["hospital"]] = item
+        count = int(r["count"] or 0)
+        # 与原 severity = 'high' 比较一致：按排序规则忽略大小写和尾随空格
+        severity = (r["severity"] or "").rstrip().lower()
+        if severity in severity_counts:
+            item[severity] += count
+            severity_counts[severity] += count
+        item["total"] += count
+        active_total += count
+        source_counts[r["source"]] = source_counts.get(r["source"], 0) + count
+    hospital_stats = list(hospital_items.values())
+    hospital_list = list(hospital_items)
+    # 非 high/medium 的记录（含 low 与异常值）均按 low 计分
+    total_score = (
+        _SEVERITY_SCORES["high"] * severity_counts["high"]
+        + _SEVERITY_SCORES["medium"] * severity_counts["medium"]
+        + _SEVERITY_SCORES["low"] * (active_total - severity_counts["high"] - severity_counts["medium"])
     )
 
-    dis_filters = []
-    dis_params = []
-    if start_dt:
-        dis_filters.append("dismissed_at >= ?")
-        dis_params.append(start_dt.strftime("%Y-%m-%d %H:%M:%S"))
-    if end_dt:
-        dis_filters.append("dismissed_at <= ?")
-        dis_params.append(end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-    dis_clause = " AND ".join(dis_filters)
-    dis_where = f"AND {dis_clause}" if dis_clause else ""
-
-    dismissed_row = query_db(
-        f"""
-        SELECT COUNT(*) AS dismissed_total
-        FROM negative_sentiments
-        WHERE {status_expr} = 'dismissed'
-        {dis_where}
-        """,
-        tuple(dis_params),
-        fetchone=True,
-    )
+    dismissed_row = query_db(dismissed_sql, tuple(params), fetchone=True)
     dismissed_total = (dismissed_row or {}).get("dismissed_total", 0)
-    sources_rows = query_db(
-        f"""
-        SELECT
-            COALESCE(NULLIF(source,''),'未知') AS source,
-            COUNT(*) AS count
-        FROM negative_sentiments
-        {active_where}
-        GROUP BY COALESCE(NULLIF(source,''),'未知')
-        ORDER BY count DESC
-        LIMIT 10
-        """,
-        tuple(params),
-    )
-    hospital_list_rows = query_db(
-        f"""
-        SELECT DISTINCT COALESCE(NULLIF(hospital_name,''),'未知') AS hospital
-        FROM negative_sentiments
-        {active_where}
-        ORDER BY hospital
-        """,
-        tuple(params),
-    )
-    hospital_rows = query_db(
-        f"""
-        SELECT
-            COALESCE(NULLIF(hospital_name,''),'未知') AS hospital,
-            SUM(CASE WHEN severity = 'high' THEN 1 ELSE 0 END) AS high,
-            SUM(CASE WHEN severity = 'medium' THEN 1 ELSE 0 END) AS medium,
-            SUM(CASE WHEN severity = 'low' THEN 1 ELSE 0 END) AS low,
-            COUNT(*) AS total
-        FROM negative_sentiments
-        {active_where}
-        GROUP BY COALESCE(NULLIF(hospital_name,''),'未知')
-        ORDER BY total DESC
-        LIMIT 10
-        """,
-        tuple(params),
-    )
-    score_count = rows["score_count"] or 0
-    avg_score = round((rows["total_score"] or 0) / score_count * 100, 1) if score_count else 0
-    return jsonify({
-        "active_total": rows["active_total"] or 0,
+    avg_score = round(total_score / active_total * 100, 1) if active_total else 0
+    return _json_response({
+        "active_total": active_total,
         "dismissed_total": dismissed_total or 0,
-        "high_total": rows["high_total"] or 0,
+        "high_total": severity_counts["high"],
         "avg_score": avg_score,
-        "severity": {
-            "high": rows["high_total"] or 0,
-            "medium": rows["medium_total"] or 0,
-            "low": rows["low_total"] or 0,
-        },
+        "severity": severity_counts,
         "sources": [
-            {"source": r["source"], "count": r["count"] or 0}
-            for r in sources_rows
-        ],
-        "hospital_list": [r["hospital"] for r in hospital_list_rows],
-        "hospitals": [
-            {
-                "hospital": r["hospital"],
-                "high": r["high"] or 0,
-                "medium": r["medium"] or 0,
-                "low": r["low"] or 0,
-                "total": r["total"] or 0,
-            }
-            for r in hospital_rows
+            {"source": source, "count": count}
+            for source, count in heapq.nlargest(10, source_counts.items(), key=itemgetter(1))
         ],
+        "hospital_list": hospital_list,
+        "hospitals": heapq.nlargest(10, hospital_stats, key=lambda item: item["total"]),
     })
 
 
 @app.get("/api/stats/trend")
+@_api_cached
 def get_trend():
     range_key = request.args.get("range", "7d")
     now = datetime.now()
@@ -510,43 +718,64 @@ def get_trend():
         start_dt = now - timedelta(days=7)
         bucket_fmt = "%m-%d"
 
+    # 在数据库内按小时/天分桶聚合，只回传 桶×严重程度 的少量行
+    if range_key == "24h":
+        bucket_expr = "DATE_ADD(DATE(processed_at), INTERVAL HOUR(processed_at) HOUR)"
+    else:
+        bucket_expr = "DATE(processed_at)"
     rows = query_db(
-        """
-        SELECT processed_at, severity
+        f"""
+        SELECT {bucket_expr} AS bucket, severity, COUNT(*) AS count
         FROM negative_sentiments
         WHERE COALESCE(NULLIF(status,''),'active') != 'dismissed'
           AND processed_at >= ?
           AND processed_at <= ?
-        ORDER BY processed_at ASC
+        GROUP BY bucket, severity
         """,
         (start_dt.strftime("%Y-%m-%d %H:%M:%S"), now.strftime("%Y-%m-%d %H:%M:%S")),
     )
 
-    buckets = defaultdict(lambda: {"count": 0, "score": 0.0})
-    cursor = start_dt
+    # 以整点/零点为锚，按偏移量直接定位桶下标
     step = timedelta(hours=1) if range_key == "24h" else timedelta(days=1)
-    while cursor <= now:
-        buckets[cursor.strftime(bucket_fmt)]
-        cursor += step
+    if range_key == "24h":
+        anchor = start_dt.replace(minute=0, second=0, microsecond=0)
+    else:
+        anchor = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    step_seconds = step.total_seconds()
+    nbuckets = int((now - anchor).total_seconds() // step_seconds) + 1
+    counts = [0] * nbuckets
+    scores = [0.0] * nbuckets
 
     for row in rows:
-        ts = _parse_db_datetime(row["processed_at"])
+        ts = _parse_db_datetime(row["bucket"])
         if not ts:
             continue
-        label = ts.strftime(bucket_fmt)
-        buckets[label]["count"] += 1
-        buckets[label]["score"] += _severity_score(row["severity"] or "low")
+        idx = int((ts - anchor).total_seconds() // step_seconds)
+        if 0 <= idx < nbuckets:
+            count = int(row["count"] or 0)
+            # GROUP BY 按排序规则忽略大小写/尾随空格，分值计算同样归一化
+            severity = (row["severity"] or "low").strip().lower()
+            counts[idx] += count
+            scores[idx] += _SEVERITY_SCORES.get(severity, _SEVERITY_SCORES["low"]) * count
+
+    # 24h 区间首尾同一小时共用标签，按标签合并后排序输出（与原有返回保持一致）
+    buckets = {}
+    for i in range(nbuckets):
+        label = (anchor + step * i).strftime(bucket_fmt)
+        item = buckets.setdefault(label, [0, 0.0])
+        item[0] += counts[i]
+        item[1] += scores[i]
 
     data = []
-    for label, item in sorted(buckets.items(), key=lambda x: x[0]):
-        avg_score = round((item["score"] / item["count"]) * 100) if item["count"] else 0
+    for label, (count, score) in sorted(buckets.items()):
+        avg_score = round((score / count) * 100) if count else 0
         data.append({
             "label": label,
-            "count": item["count"],
+            "count": count,
             "avgScore": avg_score,
         })
 
-    return jsonify({"range": range_key, "data": data})
+    return _json_response({"range": range_key, "data": data})
 
 
 @app.get("/api/opinions/<sentiment_id>")
@@ -562,8 +791,28 @@ def get_opinion(sentiment_id):
         fetchone=True,
     )
     if not row:
-        return jsonify({"error": "not_found"}), 404
-    return jsonify(row_to_opinion(row))
+        return _json_response({"error": "not_found"}, 404)
+    return _json_response(row_to_opinion(row))
+
+
+# MySQL 默认 ngram_token_size；更短的查询词无法命中全文索引
+_NGRAM_TOKEN_SIZE = 2
+# 默认英文停用词表会让 ngram 丢弃含 a、i 等字母的分词，含拉丁字母的查询仍走 LIKE
+_ASCII_LETTER_RE = re.compile(r"[A-Za-z]")
+_fulltext_search = None
+
+
+def _fulltext_search_available():
+    # 首次搜索时确认全文索引是否建成，结果在进程内复用
+    global _fulltext_search
+    if _fulltext_search is None:
+        row = query_db(
+            "SHOW INDEX FROM negative_sentiments WHERE Key_name = ?",
+            (db.FULLTEXT_INDEX_NAME,),
+            fetchone=True,
+        )
+        _fulltext_search = row is not None
+    return _fulltext_search
 
 
 @app.get("/api/search")
@@ -575,58 +824,81 @@ def search_opinions():
     preview_len = int(request.args.get("preview", 240))
 
     if not query:
-        return jsonify([])
-
-    like = f"%{query}%"
+        return _json_response([])
+
+    content_select, content_params = _opinion_content_select(compact, preview_len)
+    phrase = query.replace('"', ' ').strip()
+    if (
+        len(phrase) >= _NGRAM_TOKEN_SIZE
+        and not _ASCII_LETTER_RE.search(phrase)
+        and _fulltext_search_available()
+    ):
+        # 布尔模式下整体作为短语匹配；不含拉丁字母时 ngram 分词不受停用词影响，结果与子串查找一致
+        where_sql = "MATCH(hospital_name, title, content, source) AGAINST (? IN BOOLEAN MODE)"
+        where_params = (f'"{phrase}"',)
+    else:
+        like = f"%{query}%"
+        where_sql = "hospital_name LIKE ? OR title LIKE ? OR content LIKE ? OR source LIKE ?"
+        where_params = (like, like, like, like)
     rows = query_db(
-        """
-        SELECT id AS row_id, sentiment_id, hospital_name, title, source, content, reason,
+        f"""
+        SELECT id AS row_id, sentiment_id, hospital_name, title, source, {content_select}, reason,
                severity, url, status, dismissed_at, processed_at
         FROM negative_sentiments
-        WHERE hospital_name LIKE ? OR title LIKE ? OR content LIKE ? OR source LIKE ?
+        WHERE {where_sql}
         ORDER BY processed_at DESC
         LIMIT ? OFFSET ?
         """,
-        (like, like, like, like, limit, offset),
+        content_params + where_params + (limit, offset),
     )
-    return jsonify([row_to_opinion(r, include_content=not compact, preview_len=preview_len) for r in rows])
+    return _json_response([row_to_opinion(r, include_content=not compact, preview_len=preview_len) for r in rows])
 
 
 def call_ai(prompt):
     if not ai_config:
         return "AI 未配置"
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {ai_config.get('api_key', '')}"
-    }
-    data = {
-        "model": ai_config.get("model"),
-        "messages": [
-            {"role": "system", "content": "你是专业的舆情分析助手。"},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": ai_config.get("temperature", 0.3),
-        "max_tokens": ai_config.get("max_tokens", 800)
-    }
-
-    api_url = ai_config.get("api_url")
-    timeout = ai_config.get("timeout", 60)
-    max_retries = ai_config.get("max_retries", 2)
-    last_exc = None
+    body = orjson.dumps({
+        **_AI_PARAMS,
+        "messages": [_AI_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+    })
 
-    for attempt in range(1, max_retries + 2):
-        try:
-            resp = requests.post(api_url, headers=headers, json=data, timeout=timeout)
-            resp.raise_for_status()
-            result = resp.json()
-            return result["choices"][0]["message"]["content"]
-        except Exception as exc:
-            last_exc = exc
-            logging.warning(f"AI调用失败（第{attempt}次）: {exc}")
-            continue
+    try:
+        resp = _AI_SESSION.post(_AI_URL, headers=_AI_HEADERS, data=body, timeout=_AI_TIMEOUT)
+        resp.raise_for_status()
+        result = resp.json()
+        return result["choices"][0]["message"]["content"]
+    except Exception as exc:
+        logging.warning(f"AI调用失败: {exc}")
+        raise
+
+
+# 相同提示词（看板刷新时常见）在有效期内直接复用上次的 AI 结果
+AI_CACHE_TTL_SECONDS = ai_config.get("cache_ttl", 3600)
+AI_CACHE_MAX_ENTRIES = 512
+_ai_cache = OrderedDict()
+_ai_cache_lock = threading.Lock()
+
+
+def cached_call_ai(prompt):
+    key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+    now = time.monotonic()
+    with _ai_cache_lock:
+        entry = _ai_cache.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _ai_cache.move_to_end(key)
+                return entry[1]
+            del _ai_cache[key]
 
-    raise last_exc
+    text = call_ai(prompt)
+    if AI_CACHE_TTL_SECONDS > 0:
+        with _ai_cache_lock:
+            _ai_cache[key] = (now + AI_CACHE_TTL_SECONDS, text)
+            _ai_cache.move_to_end(key)
+            while len(_ai_cache) > AI_CACHE_MAX_ENTRIES:
+                _ai_cache.popitem(last=False)
+    return text
 
 
 def _parse_db_datetime(value):
@@ -653,6 +925,27 @@ def _parse_db_datetime(value):
             value = value.decode("utf-8")
         except Exception:
             return None
+    if not isinstance(value, str):
+        return None
+    return _parse_datetime_text(value)
+
+
+_DB_DATETIME_RE = re.compile(r"^([0-9]{4})-([0-9]{2})-([0-9]{2})(?:[ T]([0-9]{2}):([0-9]{2}):([0-9]{2}))?$")
+
+
+@lru_cache(maxsize=65536)
+def _parse_datetime_text(value):
+    # 同一时间戳在趋势/列表中反复出现，缓存解析结果（datetime 不可变，可安全共享）
+    m = _DB_DATETIME_RE.match(value)
+    if m:
+        try:
+            return datetime(
+                int(m[1]), int(m[2]), int(m[3]),
+                int(m[4] or 0), int(m[5] or 0), int(m[6] or 0),
+            )
+        except ValueError:
+            return None
+    # 非常规格式（如带微秒/时区）再走逐个尝试的慢路径
     for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
         try:
             return datetime.strptime(value, fmt)
@@ -665,17 +958,40 @@ def _parse_db_datetime(value):
 
 
 def _format_local_time(value):
+    # 已是 "YYYY-MM-DD HH:MM:SS" 的字符串解析后再格式化仍是原值，直接返回
+    if (
+        isinstance(value, str) and len(value) == 19
+        and value[4] == '-' and value[7] == '-' and value[10] == ' '
+        and value[13] == ':' and value[16] == ':'
+    ):
+        return value
     dt = _parse_db_datetime(value)
-    return dt.strftime("%Y-%m-%d %H:%M:%S") if dt else value
+    if not dt:
+        return value
+    # 无时区的常规日期用 isoformat（timespec='seconds'），输出与 strftime 一致但更快
+    if dt.tzinfo is None and dt.year >= 1000:
+        return dt.isoformat(" ", "seconds")
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
 
+# 严重程度对应的风险分，未知取值按 low 计
+_SEVERITY_SCORES = {"high": 0.92, "medium": 0.6, "low": 0.35}
 
-def _severity_score(severity):
-    if severity == "high":
-        return 0.92
-    if severity == "medium":
-        return 0.6
-    return 0.35
 
+_SUMMARY_PROMPT_HEAD = (
+    "请基于以下舆情列表生成一段“现状综述”和“公关建议”。\n"
+    "输出格式：\n"
+    "现状综述：...\n"
+    "公关建议：...\n\n"
+    "舆情列表：\n"
+)
+
+
+def _summary_line(idx, op):
+    content = op.get('content') or ''
+    if len(content) > 200:
+        content = content[:200]
+    return f"{idx}. 医院:{op.get('hospital')} 标题:{op.get('title')} 内容:{content}"
 
 
 @app.post("/api/ai/summary")
@@ -686,22 +1002,126 @@ def ai_summary():
     if not opinions:
         return jsonify({"text": "暂无负面舆情可总结。"})
 
-    lines = []
-    for idx, op in enumerate(opinions, 1):
-        lines.append(f"{idx}. 医院:{op.get('hospital')} 标题:{op.get('title')} 内容:{(op.get('content') or '')[:200]}")
-
-    prompt = (
-        "请基于以下舆情列表生成一段“现状综述”和“公关建议”。\n"
-        "输出格式：\n"
-        "现状综述：...\n"
-        "公关建议：...\n\n"
-        "舆情列表：\n" + "\n".join(lines)
+    prompt = _SUMMARY_PROMPT_HEAD + "\n".join(
+        _summary_line(idx, op) for idx, op in enumerate(opinions, 1)
     )
 
-    text = call_ai(prompt)
+    text = cached_call_ai(prompt)
     return jsonify({"text": text, "generated_at": _now_local_str()})
 
 
+# AI 洞察回写走后台线程批量提交，请求线程只入队不等待落库
+_INSIGHT_BATCH_SIZE = 100
+_INSIGHT_FLUSH_INTERVAL = 0.2
+# 进程退出时等待写入线程落库的上限
+_INSIGHT_EXIT_TIMEOUT = 10
+_INSIGHT_STOP = object()
+_insight_queue = queue.Queue()
+_insight_pending = {}
+_insight_pending_lock = threading.Lock()
+
+
+def _write_insight_batch(batch):
+    try:
+        # UPDATE 的 executemany 是逐条执行，放进同一事务只提交一次
+        with db.pooled_connection(project_root) as conn, conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE negative_sentiments SET insight_text = ?, insight_at = ? WHERE sentiment_id = ?",
+                batch,
+            )
+    except Exception:
+        logging.exception("Failed to persist %d AI insights", len(batch))
+    finally:
+        with _insight_pending_lock:
+            for text, generated_at, sentiment_id in batch:
+                if _insight_pending.get(sentiment_id) == (text, generated_at):
+                    _insight_pending.pop(sentiment_id, None)
+
+
+def _insight_writer_loop():
+    stopping = False
+    while not stopping:
+        item = _insight_queue.get()
+        if item is _INSIGHT_STOP:
+            return
+        batch = [item]
+        deadline = time.monotonic() + _INSIGHT_FLUSH_INTERVAL
+        while len(batch) < _INSIGHT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _insight_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _INSIGHT_STOP:
+                stopping = True
+                break
+            batch.append(item)
+        _write_insight_batch(batch)
+
+
+_insight_writer_pid = None
+_insight_writer_thread = None
+
+
+def _ensure_insight_writer():
+    # gunicorn 多进程 fork 后线程不会被继承，按进程懒启动写入线程
+    global _insight_writer_pid, _insight_writer_thread
+    if _insight_writer_pid == os.getpid():
+        return
+    with _insight_pending_lock:
+        if _insight_writer_pid != os.getpid():
+            _insight_writer_thread = threading.Thread(
+                target=_insight_writer_loop, name="insight-writer", daemon=True
+            )
+            _insight_writer_thread.start()
+            _insight_writer_pid = os.getpid()
+
+
+def _flush_insights_at_exit():
+    # 停止标记排在已入队的洞察之后，写入线程处理完剩余批次后退出
+    if _insight_writer_pid != os.getpid():
+        return
+    _insight_queue.put(_INSIGHT_STOP)
+    _insight_writer_thread.join(timeout=_INSIGHT_EXIT_TIMEOUT)
+    if _insight_writer_thread.is_alive():
+        logging.warning("AI insight writer did not finish within %ss at exit", _INSIGHT_EXIT_TIMEOUT)
+
+
+# 晚于 db 模块注册，先于 db.close_pools 执行
+atexit.register(_flush_insights_at_exit)
+
+
+def _enqueue_insight(sentiment_id, text, generated_at):
+    _ensure_insight_writer()
+    with _insight_pending_lock:
+        _insight_pending[sentiment_id] = (text, generated_at)
+    _insight_queue.put((text, generated_at, sentiment_id))
+
+
+# 正在生成中的洞察：同一舆情的并发请求等待同一个结果，不同舆情互不阻塞
+_insight_inflight = {}
+_insight_inflight_lock = threading.Lock()
+
+
+def _lookup_insight(sentiment_id):
+    # 尚未落库的洞察直接命中，避免批量窗口内重复调用 AI
+    with _insight_pending_lock:
+        pending = _insight_pending.get(sentiment_id)
+    if pending:
+        return pending
+    cached = query_db(
+        "SELECT insight_text, insight_at FROM negative_sentiments WHERE sentiment_id = ?",
+        (sentiment_id,),
+        fetchone=True,
+    )
+    if cached and cached["insight_text"]:
+        return cached["insight_text"], cached["insight_at"] or _now_local_str()
+    return None
+
+
 @app.post("/api/ai/insight")
 def ai_insight():
     payload = request.get_json(force=True) or {}
@@ -710,20 +1130,6 @@ def ai_insight():
     if not opinion:
         return jsonify({"text": "未提供舆情内容。"}), 400
 
-    sentiment_id = opinion.get("id")
-    if sentiment_id:
-        cached = query_db(
-            "SELECT insight_text, insight_at FROM negative_sentiments WHERE sentiment_id = ?",
-            (sentiment_id,),
-            fetchone=True,
-        )
-        if cached and cached["insight_text"]:
-            return jsonify({
-                "text": cached["insight_text"],
-                "generated_at": cached["insight_at"] or _now_local_str(),
-                "cached": True,
-            })
-
     prompt = (
         "请对以下单条舆情进行传播风险点分析，并给出简要建议（100字以内）。\n"
         f"医院:{opinion.get('hospital')}\n"
@@ -731,18 +1137,45 @@ def ai_insight():
         f"标题:{opinion.get('title')}\n"
         f"内容:{opinion.get('content')}\n"
     )
-    text = call_ai(prompt)
-    generated_at = _now_local_str()
-    if sentiment_id:
-        conn = db.connect(project_root)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE negative_sentiments SET insight_text = ?, insight_at = ? WHERE sentiment_id = ?",
-            (text, generated_at, sentiment_id),
-        )
-        conn.commit()
-        conn.close()
-    return jsonify({"text": text, "generated_at": generated_at, "cached": False})
+    sentiment_id = opinion.get("id")
+    if not sentiment_id:
+        text = cached_call_ai(prompt)
+        return jsonify({"text": text, "generated_at": _now_local_str(), "cached": False})
+    if isinstance(sentiment_id, bool) or not isinstance(sentiment_id, (str, int)):
+        return jsonify({"text": "舆情ID无效。"}), 400
+
+    cached = _lookup_insight(sentiment_id)
+    if cached is not None:
+        return jsonify({"text": cached[0], "generated_at": cached[1], "cached": True})
+
+    # 同一舆情只有第一个请求调用 AI，其余请求等待其结果
+    with _insight_inflight_lock:
+        future = _insight_inflight.get(sentiment_id)
+        owner = future is None
+        if owner:
+            future = _insight_inflight[sentiment_id] = Future()
+    if not owner:
+        text, generated_at = future.result()
+        return jsonify({"text": text, "generated_at": generated_at, "cached": True})
+
+    try:
+        # 首次查询后其他请求可能已生成并入队，登记后再复查一次
+        cached = _lookup_insight(sentiment_id)
+        if cached is None:
+            text = cached_call_ai(prompt)
+            generated_at = _now_local_str()
+            _enqueue_insight(sentiment_id, text, generated_at)
+        else:
+            text, generated_at = cached
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result((text, generated_at))
+    finally:
+        with _insight_inflight_lock:
+            _insight_inflight.pop(sentiment_id, None)
+    return jsonify({"text": text, "generated_at": generated_at, "cached": cached is not None})
 
 
 @app.get("/api/notification/suppress_keywords")
@@ -778,6 +1211,72 @@ def update_suppress_keywords():
     return jsonify({"success": True, "keywords": cleaned})
 
 
+def _run_report_job(params, start_at):
+    generator = _get_report_generator()
+    try:
+        result = generator.generate_report(**params)
+    finally:
+        generator.close()
+        # 生成过程中会原地改写 docx，目录 mtime 不一定变化，主动失效列表缓存
+        _invalidate_report_list_cache()
+
+    elapsed_ms = int((datetime.now() - start_at).total_seconds() * 1000)
+    return _build_report_payload(result, elapsed_ms)
+
+
+def _build_report_payload(result, elapsed_ms):
+    if not result.get('success'):
+        return {'success': False, 'message': result.get('message', '生成失败')}, 500
+
+    files = {}
+    file_meta = {}
+    for fmt, path in (result.get('files', {}) or {}).items():
+        filename = os.path.basename(path)
+        url = f"/api/report/download/{filename}"
+        files[fmt] = url
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        file_meta[fmt] = {
+            "filename": filename,
+            "download_url": url,
+            "size": size,
+        }
+
+    payload = {
+        'success': True,
+        'message': '报告生成成功',
+        'files': files,
+        'file_meta': file_meta,
+        'elapsed_ms': elapsed_ms,
+        'summary': {
+            'hospital': result.get('hospital_name'),
+            'period': result.get('period'),
+            'total_events': result.get('total_events'),
+            'raw_total_events': result.get('raw_total_events'),
+            'high_risk_events': result.get('high_risk_events'),
+            'included_hospitals': result.get('included_hospitals', []),
+            'data_scope': result.get('data_scope', {}),
+        }
+    }
+    if 'report' in result:
+        # format=json：直接返回结构化报告数据，不落盘文件
+        payload['report'] = result['report']
+    return payload, 200
+
+
+def _prune_report_jobs():
+    # 调用方需持有 _report_jobs_lock；仅清理已结束且超过保留时间的任务
+    now = time.monotonic()
+    expired = [
+        job_id for job_id, (created, future) in _report_jobs.items()
+        if future.done() and now - created > REPORT_JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        _report_jobs.pop(job_id, None)
+
+
 @app.post("/api/report/generate")
 def api_generate_report():
     """生成舆情报告（新报告生成器）"""
@@ -800,9 +1299,9 @@ def api_generate_report():
                 if text and text not in sentiment_ids:
                     sentiment_ids.append(text)
             if not sentiment_ids:
-                return jsonify({"success": False, "message": "请选择至少一条舆情"}), 400
+                return _json_response({"success": False, "message": "请选择至少一条舆情"}, 400)
             if len(sentiment_ids) > 5000:
-                return jsonify({"success": False, "message": "单次最多选择 5000 条舆情"}), 400
+                return _json_response({"success": False, "message": "单次最多选择 5000 条舆情"}, 400)
         raw_record_ids = data.get("record_ids")
         record_ids = None
         if isinstance(raw_record_ids, list):
@@ -815,123 +1314,225 @@ def api_generate_report():
                 if value not in record_ids:
                     record_ids.append(value)
             if raw_record_ids and not record_ids:
-                return jsonify({"success": False, "message": "勾选记录无效，请刷新后重试"}), 400
+                return _json_response({"success": False, "message": "勾选记录无效，请刷新后重试"}, 400)
             if record_ids and len(record_ids) > 5000:
-                return jsonify({"success": False, "message": "单次最多选择 5000 条记录"}), 400
+                return _json_response({"success": False, "message": "单次最多选择 5000 条记录"}, 400)
 
         if start_date and end_date and start_date > end_date:
-            return jsonify({"success": False, "message": "开始日期不能晚于结束日期"}), 400
-
-        from report_generator_mailcheck import MailCheckReportGenerator
-
-        generator = MailCheckReportGenerator()
-        result = generator.generate_report(
-            start_date=start_date,
-            end_date=end_date,
-            hospital=hospital,
-            report_period=data.get('period'),
-            output_format=output_format,
-            include_dismissed=include_dismissed,
-            dedupe_by_event=dedupe_by_event,
-            sentiment_ids=sentiment_ids,
-            record_ids=record_ids
-        )
+            return _json_response({"success": False, "message": "开始日期不能晚于结束日期"}, 400)
+
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "hospital": hospital,
+            "report_period": data.get('period'),
+            "output_format": output_format,
+            "include_dismissed": include_dismissed,
+            "dedupe_by_event": dedupe_by_event,
+            "sentiment_ids": sentiment_ids,
+            "record_ids": record_ids,
+        }
 
-        if result.get('success'):
-            files = {}
-            file_meta = {}
-            for fmt, path in (result.get('files', {}) or {}).items():
-                filename = os.path.basename(path)
-                url = f"/api/report/download/{filename}"
-                files[fmt] = url
-                try:
-                    size = os.path.getsize(path)
-                except OSError:
-                    size = None
-                file_meta[fmt] = {
-                    "filename": filename,
-                    "download_url": url,
-                    "size": size,
-                }
-
-            elapsed_ms = int((datetime.now() - start_at).total_seconds() * 1000)
-
-            return jsonify({
+        if data.get("async"):
+            job_id = uuid.uuid4().hex
+            if _report_queue is not None:
+                _report_queue.enqueue(
+                    "report_generator_mailcheck.run_report_task",
+                    params,
+                    job_id=job_id,
+                    result_ttl=REPORT_JOB_TTL_SECONDS,
+                    failure_ttl=REPORT_JOB_TTL_SECONDS,
+                )
+            else:
+                future = _report_executor.submit(_run_report_job, params, start_at)
+                with _report_jobs_lock:
+                    _prune_report_jobs()
+                    _report_jobs[job_id] = (time.monotonic(), future)
+            return _json_response({
                 'success': True,
-                'message': '报告生成成功',
-                'files': files,
-                'file_meta': file_meta,
-                'elapsed_ms': elapsed_ms,
-                'summary': {
-                    'hospital': result.get('hospital_name'),
-                    'period': result.get('period'),
-                    'total_events': result.get('total_events'),
-                    'raw_total_events': result.get('raw_total_events'),
-                    'high_risk_events': result.get('high_risk_events'),
-                    'included_hospitals': result.get('included_hospitals', []),
-                    'data_scope': result.get('data_scope', {}),
-                }
-            })
-
-        return jsonify({'success': False, 'message': result.get('message', '生成失败')}), 500
+                'message': '报告生成任务已提交',
+                'job_id': job_id,
+                'status_url': f"/api/report/status/{job_id}",
+            }, 202)
+
+        payload, status = _run_report_job(params, start_at)
+        return _json_response(payload, status)
 
     except Exception as e:
         logging.exception("Failed to generate report")
-        return jsonify({'success': False, 'message': f'生成报告失败: {str(e)}'}), 500
+        return _json_response({'success': False, 'message': f'生成报告失败: {str(e)}'}, 500)
+
+
+@app.get("/api/report/status/<job_id>")
+def api_report_status(job_id):
+    """查询异步报告生成任务状态"""
+    with _report_jobs_lock:
+        entry = _report_jobs.get(job_id)
+    if not entry:
+        if _report_queue is not None:
+            return _report_queue_status(job_id)
+        return _json_response({'success': False, 'message': '任务不存在或已过期'}, 404)
+
+    future = entry[1]
+    if not future.done():
+        return _json_response({'success': True, 'job_id': job_id, 'status': 'running'})
+
+    exc = future.exception()
+    if exc is not None:
+        logging.error("Report job %s failed", job_id, exc_info=exc)
+        return _json_response({
+            'success': False,
+            'job_id': job_id,
+            'status': 'failed',
+            'message': f'生成报告失败: {str(exc)}',
+        }, 500)
+
+    payload, status = future.result()
+    payload = dict(payload, job_id=job_id, status='done' if payload.get('success') else 'failed')
+    return _json_response(payload, status)
+
+
+def _report_queue_status(job_id):
+    try:
+        job = Job.fetch(job_id, connection=_report_queue.connection)
+    except NoSuchJobError:
+        return _json_response({'success': False, 'message': '任务不存在或已过期'}, 404)
+
+    status = job.get_status()
+    if status == "finished":
+        # 报告由 worker 进程写入，本进程的列表缓存需主动失效
+        _invalidate_report_list_cache()
+        elapsed_ms = None
+        if job.started_at and job.ended_at:
+            elapsed_ms = int((job.ended_at - job.started_at).total_seconds() * 1000)
+        payload, code = _build_report_payload(job.result or {}, elapsed_ms)
+        payload = dict(payload, job_id=job_id, status='done' if payload.get('success') else 'failed')
+        return _json_response(payload, code)
+
+    if status in ("failed", "stopped", "canceled"):
+        logging.error("Report job %s failed: %s", job_id, job.exc_info)
+        lines = (job.exc_info or "").strip().splitlines()
+        return _json_response({
+            'success': False,
+            'job_id': job_id,
+            'status': 'failed',
+            'message': f'生成报告失败: {lines[-1] if lines else status}',
+        }, 500)
+
+    return _json_response({'success': True, 'job_id': job_id, 'status': 'running'})
 
 
 @app.get("/api/report/download/<filename>")
 def api_download_report(filename):
     """下载生成的报告（新报告生成器）"""
     try:
-        if not filename or '..' in filename or '/' in filename:
-            return jsonify({'success': False, 'message': '无效的文件名'}), 400
-
-        file_path = os.path.join(REPORTS_DIR, filename)
-
-        if not os.path.exists(file_path):
-            return jsonify({'success': False, 'message': '文件不存在'}), 404
-
-        return send_file(file_path, as_attachment=True, download_name=filename)
+        if not filename or '\x00' in filename:
+            return _json_response({'success': False, 'message': '无效的文件名'}, 400)
+
+        # 解析符号链接后必须仍位于报告目录内（覆盖 ..、绝对路径、反斜杠等情况）
+        file_path = os.path.realpath(os.path.join(REPORTS_DIR, filename))
+        if file_path == REPORTS_REAL_DIR or os.path.commonpath([file_path, REPORTS_REAL_DIR]) != REPORTS_REAL_DIR:
+            return _json_response({'success': False, 'message': '无效的文件名'}, 400)
+
+        if not os.path.isfile(file_path):
+            return _json_response({'success': False, 'message': '文件不存在'}, 404)
+
+        # send_file 以文件块流式输出；开启条件请求后支持 Range 断点续传与 304
+        return send_file(
+            file_path,
+            as_attachment=True,
+            download_name=filename,
+            conditional=True,
+            etag=True,
+            max_age=0,
+        )
 
     except Exception as e:
         logging.exception("Failed to download report")
-        return jsonify({'success': False, 'message': f'下载失败: {str(e)}'}), 500
+        return _json_response({'success': False, 'message': f'下载失败: {str(e)}'}, 500)
 
 
 @app.get("/api/report/list")
 def api_list_reports():
     """列出已生成的报告（新报告生成器）"""
     try:
-        if not os.path.exists(REPORTS_DIR):
-            return jsonify({'success': True, 'reports': []})
-
-        reports = []
-        for filename in os.listdir(REPORTS_DIR):
-            file_path = os.path.join(REPORTS_DIR, filename)
-            if os.path.isfile(file_path):
-                stat = os.stat(file_path)
-                file_ext = os.path.splitext(filename)[1].lower()
-                if file_ext not in ('.md', '.docx'):
-                    continue
-                fmt = 'word' if file_ext == '.docx' else 'markdown'
-                reports.append({
-                    'filename': filename,
-                    'download_url': f"/api/report/download/{filename}",
-                    'created_at': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                    'created_ts': stat.st_ctime,
-                    'size': stat.st_size,
-                    'format': fmt,
-                })
-
-        reports.sort(key=lambda x: x['created_ts'], reverse=True)
-        for item in reports:
-            item.pop('created_ts', None)
-        return jsonify({'success': True, 'reports': reports[:50]})
+        body, etag = _get_report_list_body()
+        response = app.response_class(body, mimetype="application/json")
+        # 前端轮询时可凭 ETag 获得 304，无需重复传输列表
+        response.set_etag(etag)
+        response.cache_control.max_age = 5
+        return response.make_conditional(request)
 
     except Exception as e:
         logging.exception("Failed to list reports")
-        return jsonify({'success': False, 'message': f'获取列表失败: {str(e)}'}), 500
+        return _json_response({'success': False, 'message': f'获取列表失败: {str(e)}'}, 500)
+
+
+def _get_report_list_body():
+    try:
+        dir_mtime = os.stat(REPORTS_DIR).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = -1
+
+    with _report_list_lock:
+        if _report_list_cache["body"] is not None and _report_list_cache["mtime"] == dir_mtime:
+            return _report_list_cache["body"], _report_list_cache["etag"]
+
+        reports = _scan_reports() if dir_mtime != -1 else []
+        body = _json_dumps({'success': True, 'reports': reports})
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        _report_list_cache.update(mtime=dir_mtime, body=body, etag=etag)
+        return body, etag
+
+
+def _invalidate_report_list_cache():
+    with _report_list_lock:
+        _report_list_cache.update(mtime=None, body=None, etag=None)
+
+
+def _scan_reports(limit=50):
+    candidates = []
+    with os.scandir(REPORTS_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            filename = entry.name
+            dot = filename.rfind('.')
+            fmt = REPORT_FORMATS_BY_EXT.get(filename[dot:].lower()) if dot > 0 else None
+            if fmt is None:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            candidates.append((stat.st_ctime, filename, stat.st_size, fmt))
+
+    # 只对最近的报告做时间格式化
+    return [
+        {
+            'filename': filename,
+            'download_url': f"/api/report/download/{filename}",
+            'created_at': datetime.fromtimestamp(ctime).strftime('%Y-%m-%d %H:%M:%S'),
+            'size': size,
+            'format': fmt,
+        }
+        for ctime, filename, size, fmt in heapq.nlargest(limit, candidates)
+    ]
+
+
+def _safe_link(url):
+    # 自动转义挡不住 javascript: 等协议，href 只放行 http(s) 链接
+    url = (url or '').strip()
+    return url if url.lower().startswith(('http://', 'https://')) else ''
+
+
+_SEVERITY_COLORS = {
+    'high': '#ff4d4f',
+    'medium': '#faad14',
+    'low': '#52c41a'
+}
+_SEVERITY_LABELS = {
+    'high': '高',
+    'medium': '中',
+    'low': '低'
+}
 
 
 @app.get('/feedback')
@@ -942,177 +1543,35 @@ def feedback_form():
     if not verify_signature(sentiment_id, sig):
         return "Invalid or expired link.", 403
 
-    sentiment_info = get_sentiment_info(sentiment_id)
+    sentiment_info, feedback_list = get_sentiment_bundle(sentiment_id)
 
+    info = None
     if sentiment_info:
-        hospital_name = sentiment_info['hospital_name'] or ''
-        title = sentiment_info['title'] or ''
-        source = sentiment_info['source'] or ''
-        content = sentiment_info['content'] or ''
-        reason = sentiment_info['reason'] or ''
         severity = sentiment_info['severity'] or 'medium'
-        url = sentiment_info.get('url', '')
-        status = sentiment_info.get('status', 'active')
-        dismissed_at = sentiment_info.get('dismissed_at')
-        feedback_list = get_feedback_list(sentiment_id)
-
-        severity_colors = {
-            'high': '#ff4d4f',
-            'medium': '#faad14',
-            'low': '#52c41a'
+        info = {
+            'hospital_name': sentiment_info['hospital_name'] or '',
+            'title': sentiment_info['title'] or '',
+            'source': sentiment_info['source'] or '',
+            'content': sentiment_info['content'] or '',
+            'reason': sentiment_info['reason'] or '',
+            'severity_color': _SEVERITY_COLORS.get(severity, '#faad14'),
+            'severity_text': _SEVERITY_LABELS.get(severity, '中'),
+            'url': sentiment_info.get('url', ''),
+            'link': _safe_link(sentiment_info.get('url')),
+            'status': sentiment_info.get('status', 'active'),
+            'dismissed_at': sentiment_info.get('dismissed_at'),
         }
-        severity_label = {
-            'high': '高',
-            'medium': '中',
-            'low': '低'
-        }
-        severity_color = severity_colors.get(severity, '#faad14')
-        severity_text = severity_label.get(severity, '中')
-
-        feedback_items = ""
-        if feedback_list:
-            for item in feedback_list:
-                feedback_items += f"""
-                <div class="feedback-item">
-                  <div class="feedback-meta">{item['feedback_time']} | {item['feedback_type']} | {item['user_id']}</div>
-                  <div class="feedback-text">{item['feedback_text']}</div>
-                </div>
-                """
-        else:
-            feedback_items = "<div class=\"feedback-empty\">暂无反馈</div>"
-
-        status_line = ""
-        restore_button = ""
-        if status == 'dismissed':
-            dismissed_label = dismissed_at or '未知时间'
-            status_line = f"""
-          <div class="info-row">
-            <span class="label">状态：</span>
-            <span class="value" style="color: #52c41a; font-weight: bold;">已标记为误报（{dismissed_label}）</span>
-          </div>
-            """
-            restore_button = """
-      <button class="btn btn-restore" type="submit" name="action" value="restore">↺ 恢复为负面</button>
-            """
-
-        info_section = f"""
-        <div class="info-section">
-          <h4>舆情详情</h4>
-          <div class="info-row">
-            <span class="label">舆情ID：</span>
-            <span class="value">{sentiment_id}</span>
-          </div>
-          {status_line}
-          <div class="info-row">
-            <span class="label">医院：</span>
-            <span class="value">{hospital_name}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">来源：</span>
-            <span class="value">{source}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">严重程度：</span>
-            <span class="value" style="color: {severity_color}; font-weight: bold;">{severity_text}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">标题：</span>
-            <span class="value">{title}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">原文链接：</span>
-            <span class="value"><a href="{url}" target="_blank" style="color: #1890ff;">{url or '无'}</a></span>
-          </div>
-          <div class="info-row">
-            <span class="label">内容：</span>
-            <span class="value">{content}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">AI判断：</span>
-            <span class="value">{reason}</span>
-          </div>
-        </div>
-        <div class="feedback-section">
-          <h4>用户反馈</h4>
-          {feedback_items}
-        </div>
-        """
-    else:
-        info_section = f"""
-        <div class="info-section" style="background: #fffbe6; border-color: #ffe58f;">
-          <h4>舆情详情</h4>
-          <p style="color: #faad14;">⚠️ 测试数据（未存入数据库）</p>
-          <div class="info-row">
-            <span class="label">舆情ID：</span>
-            <span class="value">{sentiment_id}</span>
-          </div>
-          <div class="info-row">
-            <span class="label">说明：</span>
-            <span class="value">此舆情数据为测试生成，未存入数据库。如需测试完整功能，请通过实际监控产生舆情数据。</span>
-          </div>
-        </div>
-        """
 
-    return f"""<!DOCTYPE html>
-<html lang="zh">
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>舆情反馈</title>
-  <style>
-    body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; padding: 24px; background: #f5f5f5; margin: 0; }}
-    .container {{ max-width: 640px; margin: 0 auto; background: white; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); padding: 32px; }}
-    h3 {{ margin-top: 0; color: #333; border-bottom: 2px solid #1890ff; padding-bottom: 12px; }}
-    h4 {{ margin: 0 0 16px 0; color: #1890ff; font-size: 16px; }}
-    .info-section {{ background: #f0f7ff; border: 1px solid #d6e4ff; border-radius: 6px; padding: 16px; margin-bottom: 24px; }}
-    .feedback-section {{ background: #fafafa; border: 1px solid #f0f0f0; border-radius: 6px; padding: 16px; margin-bottom: 24px; }}
-    .feedback-item {{ border-bottom: 1px solid #f0f0f0; padding: 10px 0; }}
-    .feedback-item:last-child {{ border-bottom: none; }}
-    .feedback-meta {{ color: #8c8c8c; font-size: 12px; margin-bottom: 6px; }}
-    .feedback-text {{ color: #262626; font-size: 14px; }}
-    .feedback-empty {{ color: #8c8c8c; font-size: 13px; }}
-    .info-row {{ margin-bottom: 12px; display: flex; align-items: flex-start; }}
-    .info-row:last-child {{ margin-bottom: 0; }}
-    .label {{ font-weight: 600; color: #595959; min-width: 80px; flex-shrink: 0; }}
-    .value {{ color: #262626; flex: 1; word-break: break-word; }}
-    textarea {{ width: 100%; height: 100px; padding: 12px; border: 1px solid #d9d9d9; border-radius: 4px; font-size: 14px; font-family: inherit; resize: vertical; box-sizing: border-box; }}
-    textarea:focus {{ outline: none; border-color: #1890ff; box-shadow: 0 0 0 2px rgba(24,144,255,0.2); }}
-    .btn-group {{ margin-top: 20px; display: flex; gap: 12px; flex-wrap: wrap; }}
-    .btn {{ padding: 10px 24px; font-size: 14px; font-weight: 500; border: none; border-radius: 4px; cursor: pointer; transition: all 0.3s; }}
-    .btn-false {{ background: #52c41a; color: white; }}
-    .btn-false:hover {{ background: #73d13d; }}
-    .btn-true {{ background: #ff4d4f; color: white; }}
-    .btn-true:hover {{ background: #ff7875; }}
-    .btn-restore {{ background: #1890ff; color: white; }}
-    .btn-restore:hover {{ background: #40a9ff; }}
-    label {{ font-weight: 600; color: #333; display: block; margin-bottom: 8px; }}
-  </style>
-</head>
-<body>
-  <div class="container">
-    <h3>舆情反馈</h3>
-    {info_section}
-    <label>补充说明（可选）：</label>
-    <textarea name="feedback_text" placeholder="例如：误报，内容与医院无关"></textarea>
-    <form method="post" action="/feedback" style="margin-top: 20px;">
-      <input type="hidden" name="sentiment_id" value="{sentiment_id}">
-      <input type="hidden" name="sig" value="{sig}">
-      <input type="hidden" name="feedback_text" id="feedback_text_hidden">
-      <div class="btn-group">
-        <button class="btn btn-false" type="submit" name="judgment" value="false">✓ 误判舆情</button>
-        <button class="btn btn-true" type="submit" name="judgment" value="true">✗ 确认负面</button>
-        {restore_button}
-      </div>
-    </form>
-  </div>
-  <script>
-    document.querySelector('textarea').addEventListener('input', function() {{
-      document.getElementById('feedback_text_hidden').value = this.value;
-    }});
-  </script>
-</body>
-</html>
-"""
+    # 模板由 Jinja2 编译后缓存，并对舆情标题/正文/链接等外部内容自动转义
+    response = app.make_response(render_template(
+        'feedback.html',
+        sentiment_id=sentiment_id,
+        sig=sig,
+        info=info,
+        feedback_list=feedback_list,
+    ))
+    response.headers['Cache-Control'] = 'private, max-age=0'
+    return response
 
 
 @app.post('/feedback')
@@ -1160,9 +1619,41 @@ def submit_feedback():
     return "已收到反馈，感谢！"
 
 
+def _run_gunicorn(host, port, api_cfg):
+    # gthread worker：AI 调用和数据库读都是 I/O 密集，线程可重叠等待，默认单进程靠线程扩展。
+    # 接口缓存失效只作用于处理该请求的进程；报告任务状态仅在配置 Redis 队列时跨进程共享，
+    # 因此未配置 report_queue.redis_url 时强制单进程
+    workers = int(api_cfg.get("workers", 1))
+    if workers > 1 and _report_queue is None:
+        logging.warning("未配置 report_queue.redis_url，报告任务状态无法跨进程共享，gunicorn 以单进程运行")
+        workers = 1
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": int(api_cfg.get("threads", 8)),
+        # AI 接口超时加重试可能超过默认 30 秒
+        "timeout": int(api_cfg.get("worker_timeout", 120)),
+    }
+
+    class _APIServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    _APIServer().run()
+
+
 if __name__ == "__main__":
     init_database()
     api_cfg = config.get("api", {})
     host = api_cfg.get("host", "0.0.0.0")
     port = int(api_cfg.get("port", 5003))
-    app.run(host=host, port=port, debug=False)
+    if GUNICORN_AVAILABLE:
+        _run_gunicorn(host, port, api_cfg)
+    else:
+        logging.warning("gunicorn not installed, falling back to threaded Werkzeug server")
+        app.run(host=host, port=port, debug=False, threaded=True)
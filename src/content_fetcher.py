@@ -8,6 +8,7 @@
 import requests
 import yaml
 import logging
+from collections import Counter
 
 class ContentFetcher:
     def __init__(self, config):
@@ -106,21 +107,16 @@ class ContentFetcher:
             return "无舆情数据"
         
         total = len(sentiments)
-        negative = len([s for s in sentiments if s.get('attitudeMerge') == '-1'])
-        positive = len([s for s in sentiments if s.get('attitudeMerge') == '1'])
+        attitude_counts = Counter(s.get('attitudeMerge') for s in sentiments)
         
         summary = {
             'total': total,
-            'negative': negative,
-            'positive': positive,
-            'sources': {}
+            'negative': attitude_counts['-1'],
+            'positive': attitude_counts['1'],
+            # 统计来源
+            'sources': dict(Counter(s.get('webName', '未知') for s in sentiments))
         }
         
-        # 统计来源
-        for s in sentiments:
-            source = s.get('webName', '未知')
-            summary['sources'][source] = summary['sources'].get(source, 0) + 1
-        
         return summary
 
 if __name__ == '__main__':
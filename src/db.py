@@ -6,7 +6,13 @@
 
 from __future__ import annotations
 
+import atexit
+import copy
+import logging
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Any, Dict, Iterable, Tuple
 
 import yaml
@@ -19,10 +25,23 @@ except Exception:
     MYSQL_AVAILABLE = False
 
 
+# 每次建连/执行都会读取配置，按 (mtime, size) 缓存解析结果，文件未变时跳过 YAML 解析
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_config_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_config_cache_lock = threading.Lock()
+
+
 def load_config(project_root: str) -> Dict[str, Any]:
     config_path = os.path.join(project_root, "config", "config.yaml")
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    st = os.stat(config_path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    with _config_cache_lock:
+        cached = _config_cache.get(config_path)
+        if cached is None or cached[0] != stat_key:
+            with open(config_path, "r", encoding="utf-8") as f:
+                cached = (stat_key, yaml.load(f, Loader=_YAML_LOADER) or {})
+            _config_cache[config_path] = cached
+        return copy.deepcopy(cached[1])
 
 
 def get_db_engine(config: Dict[str, Any]) -> str:
@@ -38,6 +57,7 @@ def get_mysql_config(config: Dict[str, Any]) -> Dict[str, Any]:
         "password": mysql.get("password", ""),
         "database": mysql.get("database", "mail_check"),
         "charset": mysql.get("charset", "utf8mb4"),
+        "init_command": mysql.get("init_command") or None,
     }
 
 
@@ -78,6 +98,27 @@ class _MysqlCompatConnection:
     def commit(self):
         return self._conn.commit()
 
+    def begin(self):
+        return self._conn.begin()
+
+    def rollback(self):
+        return self._conn.rollback()
+
+    # 连接默认 autocommit，单条语句无需再 commit；多条写入用 with conn: 合并为一个事务
+    def __enter__(self):
+        self._conn.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def ping(self):
+        return self._conn.ping(reconnect=True)
+
     def close(self):
         return self._conn.close()
 
@@ -97,42 +138,103 @@ def connect(project_root: str):
         charset=mysql_cfg["charset"],
         cursorclass=DictCursor,
         autocommit=True,
+        # 会话级参数在建连时设置一次，池化连接复用期间无需重复下发
+        init_command=mysql_cfg["init_command"],
     )
     return _MysqlCompatConnection(conn, engine)
 
 
-def execute(project_root: str, sql: str, params: Iterable[Any] = (), fetchone: bool = False, fetchall: bool = False):
-    config = load_config(project_root)
-    engine = get_db_engine(config)
-    conn = connect(project_root)
+# 空闲连接池：按 project_root 区分，复用长连接，避免每次查询重新握手认证
+POOL_MAX_IDLE = 8
+_pools: Dict[str, "queue.LifoQueue"] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(project_root: str) -> "queue.LifoQueue":
+    pool = _pools.get(project_root)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(project_root, queue.LifoQueue(maxsize=POOL_MAX_IDLE))
+    return pool
+
+
+def close_pools() -> None:
+    # 进程退出时主动关闭空闲连接，服务端不必等到 wait_timeout 才回收会话
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        while True:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+atexit.register(close_pools)
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    return MYSQL_AVAILABLE and isinstance(exc, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+
+
+@contextmanager
+def pooled_connection(project_root: str):
+    # 借出时 ping 一次以处理服务端超时断开；连接级异常时丢弃而不放回
+    pool = _get_pool(project_root)
     try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = connect(project_root)
+    else:
+        try:
+            conn.ping()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            conn = connect(project_root)
+
+    broken = False
+    try:
+        yield conn
+    except Exception as exc:
+        broken = _is_connection_error(exc)
+        raise
+    finally:
+        if broken:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+
+def execute(project_root: str, sql: str, params: Iterable[Any] = (), fetchone: bool = False, fetchall: bool = False):
+    # 兼容游标已负责占位符转换，这里直接借用池化连接
+    with pooled_connection(project_root) as conn:
         cursor = conn.cursor()
-        cursor.execute(_adapt_sql(sql, engine), params)
+        cursor.execute(sql, params)
         if fetchone:
             return cursor.fetchone()
         if fetchall:
             return cursor.fetchall()
         return None
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 def execute_with_lastrowid(project_root: str, sql: str, params: Iterable[Any] = ()) -> int | None:
-    config = load_config(project_root)
-    engine = get_db_engine(config)
-    conn = connect(project_root)
-    try:
+    with pooled_connection(project_root) as conn:
         cursor = conn.cursor()
-        cursor.execute(_adapt_sql(sql, engine), params)
+        cursor.execute(sql, params)
         return cursor.lastrowid
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 def ensure_mysql_database(config: Dict[str, Any]):
@@ -162,10 +264,53 @@ def ensure_schema(project_root: str):
     _ensure_mysql_tables(project_root, config)
 
 
+# 表结构版本：修改 _migrate_mysql_tables 中的建表/加列/建索引逻辑时需同步递增
+SCHEMA_VERSION = 3
+_SCHEMA_LOCK_NAME = "mail_check_schema_migration"
+FULLTEXT_INDEX_NAME = "ft_negative_sentiments_search"
+
+
+def _get_schema_version(cursor) -> int:
+    cursor.execute("SELECT version FROM schema_version WHERE id = 1")
+    row = cursor.fetchone()
+    return int(row["version"]) if row else 0
+
+
 def _ensure_mysql_tables(project_root: str, config: Dict[str, Any]):
+    # 已是最新版本时只读一次版本号，跳过逐列/逐索引的 INFORMATION_SCHEMA 检查
     conn = connect(project_root)
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                id TINYINT PRIMARY KEY,
+                version INT NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        ''')
+        if _get_schema_version(cursor) >= SCHEMA_VERSION:
+            return
+
+        # API 服务与监控主程序可能同时启动，用命名锁保证只有一个进程执行迁移
+        cursor.execute("SELECT GET_LOCK(?, 60) AS locked", (_SCHEMA_LOCK_NAME,))
+        if cursor.fetchone()["locked"] != 1:
+            # 超时（0）或出错（NULL）时未持有锁，既不能迁移也不能释放
+            raise RuntimeError("等待表结构迁移锁超时，可能有其他进程正在迁移，请稍后重试。")
+        try:
+            if _get_schema_version(cursor) < SCHEMA_VERSION:
+                _migrate_mysql_tables(cursor)
+                cursor.execute(
+                    "REPLACE INTO schema_version (id, version) VALUES (1, ?)",
+                    (SCHEMA_VERSION,),
+                )
+                conn.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(?) AS released", (_SCHEMA_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        conn.close()
+
 
+def _migrate_mysql_tables(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS processed_emails (
             id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -285,6 +430,48 @@ def _ensure_mysql_tables(project_root: str, config: Dict[str, Any]):
         cursor.execute('CREATE INDEX idx_negative_sentiments_sentiment_id ON negative_sentiments(sentiment_id)')
     if not _mysql_index_exists("negative_sentiments", "idx_negative_sentiments_event_id"):
         cursor.execute('CREATE INDEX idx_negative_sentiments_event_id ON negative_sentiments(event_id)')
+    # 复合/覆盖索引：列表按时间倒序、统计与趋势按时间窗口聚合 status/severity
+    created_composite = False
+    if not _mysql_index_exists("negative_sentiments", "idx_negative_sentiments_status_time"):
+        cursor.execute('CREATE INDEX idx_negative_sentiments_status_time ON negative_sentiments(status, processed_at)')
+        created_composite = True
+    if not _mysql_index_exists("negative_sentiments", "idx_negative_sentiments_hospital_time"):
+        cursor.execute('CREATE INDEX idx_negative_sentiments_hospital_time ON negative_sentiments(hospital_name, processed_at)')
+        created_composite = True
+    if not _mysql_index_exists("negative_sentiments", "idx_negative_sentiments_time_status_severity"):
+        cursor.execute(
+            'CREATE INDEX idx_negative_sentiments_time_status_severity '
+            'ON negative_sentiments(processed_at, status, severity)'
+        )
+        created_composite = True
+    # 看板“已误报”计数按 dismissed_at 时间窗口过滤
+    if not _mysql_index_exists("negative_sentiments", "idx_negative_sentiments_dismissed_time"):
+        cursor.execute(
+            'CREATE INDEX idx_negative_sentiments_dismissed_time '
+            'ON negative_sentiments(dismissed_at, status)'
+        )
+        created_composite = True
+    if created_composite:
+        # 刷新统计信息，让优化器立即选用新索引
+        cursor.execute('ANALYZE TABLE negative_sentiments')
+        cursor.fetchall()
+    # 舆情搜索用全文索引，ngram 分词支持中文子串匹配；不支持 ngram 的实例（如 MariaDB）
+    # 建索引会失败，此时搜索接口继续走 LIKE
+    if not _mysql_index_exists("negative_sentiments", FULLTEXT_INDEX_NAME):
+        try:
+            cursor.execute(
+                f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} '
+                'ON negative_sentiments(hospital_name, title, content, source) WITH PARSER ngram'
+            )
+        except pymysql.err.MySQLError as exc:
+            # 表结构版本仍会递增，之后不再重试；需要时可手工建索引（见 FULLTEXT_INDEX_NAME）
+            logging.warning("创建全文索引 %s 失败，舆情搜索将使用 LIKE: %s", FULLTEXT_INDEX_NAME, exc)
+    # 反馈页按舆情取最近反馈（ORDER BY created_at DESC LIMIT 20）
+    if not _mysql_index_exists("sentiment_feedback", "idx_sentiment_feedback_sentiment_created"):
+        cursor.execute(
+            'CREATE INDEX idx_sentiment_feedback_sentiment_created '
+            'ON sentiment_feedback(sentiment_id, created_at)'
+        )
     if not _mysql_index_exists("feedback_queue", "idx_feedback_queue_user_status"):
         cursor.execute('CREATE INDEX idx_feedback_queue_user_status ON feedback_queue(user_id, status, sent_time)')
     if not _mysql_index_exists("event_groups", "idx_event_groups_hospital_time"):
@@ -295,6 +482,3 @@ def _ensure_mysql_tables(project_root: str, config: Dict[str, Any]):
         # utf8mb4 下 1024 字符可能超过 InnoDB 索引长度上限（3072 bytes）。
         # 用前缀索引既能支持等值查询的快速过滤，又避免建索引失败。
         cursor.execute('CREATE INDEX idx_event_groups_url ON event_groups(event_url(191))')
-
-    conn.commit()
-    conn.close()
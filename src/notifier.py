@@ -15,10 +15,54 @@ from urllib.parse import urlencode
 import requests
 import yaml
 
+
+# Telegram 消息模板在模块加载时定义一次，发送时只做 format_map 填充
+_TELEGRAM_MARKDOWN_TEMPLATE = """
+{prefix} **{title}**
+
+**医院：** {hospital_name}
+
+**来源：** {source}
+**AI判断：** {reason}
+**严重程度：** {severity}
+{url_line}
+
+**详细内容：**
+{content}
+
+请及时查看详情。
+"""
+
+_TELEGRAM_TEXT_TEMPLATE = """
+{prefix} {title}
+
+医院: {hospital_name}
+来源: {source}
+标题: {source_title}
+AI判断: {reason}
+严重程度: {severity}
+
+详细内容:
+{content}
+
+请及时查看详情。
+"""
+
+
+class _TemplateContext(dict):
+    """缺失字段渲染为空字符串，避免模板变量缺失时抛出 KeyError"""
+
+    def __missing__(self, key):
+        return ''
+
+
 class Notifier:
     def __init__(self, config):
         self.config = config.get('notification', {})
         self.feedback_config = config.get('feedback', {})
+        # 反馈链接签名用的 HMAC 预先完成密钥填充，每条通知只需 copy 后签名
+        link_secret = self.feedback_config.get('link_secret')
+        self._link_hmac = hmac.new(link_secret.encode('utf-8'), digestmod=hashlib.sha256) if link_secret else None
         self.provider = self.config.get('provider', 'console')  # 默认控制台输出
         self.logger = logging.getLogger(__name__)
         
@@ -179,21 +223,16 @@ class Notifier:
                 else:
                     url_line = ""
 
-                message = f"""
-{message_prefix} **{title}**
-
-**医院：** {hospital_name}
-
-**来源：** {source}
-**AI判断：** {sentiment_info.get('reason', '未判断')}
-**严重程度：** {sentiment_info.get('severity', 'medium')}
-{url_line}
-
-**详细内容：**
-{content}
-
-请及时查看详情。
-"""
+                message = _TELEGRAM_MARKDOWN_TEMPLATE.format_map(_TemplateContext(
+                    prefix=message_prefix,
+                    title=title,
+                    hospital_name=hospital_name,
+                    source=source,
+                    reason=sentiment_info.get('reason', '未判断'),
+                    severity=sentiment_info.get('severity', 'medium'),
+                    url_line=url_line,
+                    content=content,
+                ))
             elif enable_html:
                 # HTML格式
                 source = sentiment_info.get('source', '未知')
@@ -298,20 +337,16 @@ class Notifier:
 """
             else:
                 # 纯文本格式（默认）
-                message = f"""
-{message_prefix} {title}
-
-医院: {hospital_name}
-来源: {sentiment_info.get('source', '未知')}
-标题: {sentiment_info.get('title', '无标题')}
-AI判断: {sentiment_info.get('reason', '未判断')}
-严重程度: {sentiment_info.get('severity', 'medium')}
-
-详细内容:
-{content}
-
-请及时查看详情。
-"""
+                message = _TELEGRAM_TEXT_TEMPLATE.format_map(_TemplateContext(
+                    prefix=message_prefix,
+                    title=title,
+                    hospital_name=hospital_name,
+                    source=sentiment_info.get('source', '未知'),
+                    source_title=sentiment_info.get('title', '无标题'),
+                    reason=sentiment_info.get('reason', '未判断'),
+                    severity=sentiment_info.get('severity', 'medium'),
+                    content=content,
+                ))
             
             # Telegram API调用
             url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
@@ -400,12 +435,12 @@ AI判断: {reason}
 
     def _build_feedback_url(self, sentiment_id):
         base_url = self.feedback_config.get('link_base_url')
-        secret = self.feedback_config.get('link_secret')
-        if not base_url or not secret or not sentiment_id:
+        if not base_url or self._link_hmac is None or not sentiment_id:
             return None
 
-        message = f"{sentiment_id}".encode('utf-8')
-        sig = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+        mac = self._link_hmac.copy()
+        mac.update(f"{sentiment_id}".encode('utf-8'))
+        sig = mac.hexdigest()
 
         query = urlencode({
             'sentiment_id': sentiment_id,
@@ -11,10 +11,14 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from collections import Counter
+import heapq
 import re
 import json
 import os
+import threading
 import unicodedata
+from functools import lru_cache
+from operator import itemgetter
 
 import requests
 import yaml
@@ -39,11 +43,96 @@ try:
     import matplotlib.pyplot as plt
     import matplotlib.font_manager as fm
     from matplotlib import rcParams
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
     plt.rcParams['axes.unicode_minus'] = False
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
+# Markdown 渲染为 Word 时逐行/逐单元格使用的正则，模块加载时编译一次
+_MD_IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(([^\)]+)\)')
+_MD_BOLD_SPLIT_RE = re.compile(r'(\*\*[^\*]+\*\*)')
+
+# 关键词提取时过滤的停用词
+_KEYWORD_STOP_WORDS = frozenset({
+    '的', '了', '是', '在', '我', '有', '和', '就', '不', '人',
+    '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去',
+    '你', '会', '着', '没有', '看', '好', '自己', '这', '但',
+})
+
+# 事件类型推断规则，按优先级排列
+_EVENT_TYPE_RULES = [
+    ('死亡|去世|抢救无效|手术死亡', '医疗质量-死亡事件'),
+    ('投诉|态度差|服务差', '服务质量投诉'),
+    ('费用|收费|贵', '收费问题'),
+    ('等待|排队|时间长', '流程问题'),
+]
+
+# matplotlib 非线程安全：并发的报告任务按锁串行出图；锁内复用同一个 Figure，省去每张图重新创建画布的开销
+_CHART_LOCK = threading.Lock()
+_chart_figure = None
+
+
+@lru_cache(maxsize=1)
+def _configure_matplotlib_font() -> Optional[str]:
+    """为服务器端图表选择可用的中文字体（进程内只解析/注册一次字体文件）。"""
+    if not MATPLOTLIB_AVAILABLE:
+        return None
+
+    family_candidates = [
+        "Noto Sans CJK SC",
+        "Noto Sans CJK JP",
+        "Microsoft YaHei",
+        "SimHei",
+        "WenQuanYi Micro Hei",
+        "PingFang SC",
+        "Source Han Sans SC",
+        "Arial Unicode MS",
+    ]
+    file_candidates = [
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/truetype/arphic/ukai.ttc",
+        "/usr/share/fonts/truetype/arphic/uming.ttc",
+        "/System/Library/Fonts/PingFang.ttc",
+        "/System/Library/Fonts/STHeiti Light.ttc",
+        "/Library/Fonts/Arial Unicode.ttf",
+        "C:\\Windows\\Fonts\\msyh.ttc",
+        "C:\\Windows\\Fonts\\simhei.ttf",
+    ]
+
+    selected_family = None
+
+    try:
+        for font_path in file_candidates:
+            if not os.path.exists(font_path):
+                continue
+            fm.fontManager.addfont(font_path)
+            selected_family = fm.FontProperties(fname=font_path).get_name()
+            if selected_family:
+                break
+
+        if not selected_family:
+            installed_families = {font.name for font in fm.fontManager.ttflist}
+            for family in family_candidates:
+                if family in installed_families:
+                    selected_family = family
+                    break
+    except Exception:
+        selected_family = None
+
+    fallback_families = ["DejaVu Sans", "Arial", "sans-serif"]
+    if selected_family:
+        plt.rcParams["font.sans-serif"] = [selected_family] + fallback_families
+    else:
+        plt.rcParams["font.sans-serif"] = fallback_families
+
+    plt.rcParams["axes.unicode_minus"] = False
+    return selected_family
+
 
 class EnhancedReportGenerator:
     """增强版舆情报告生成器"""
@@ -105,61 +194,7 @@ class EnhancedReportGenerator:
 
     def _configure_matplotlib_font(self) -> Optional[str]:
         """为服务器端图表选择可用的中文字体。"""
-        if not MATPLOTLIB_AVAILABLE:
-            return None
-
-        family_candidates = [
-            "Noto Sans CJK SC",
-            "Noto Sans CJK JP",
-            "Microsoft YaHei",
-            "SimHei",
-            "WenQuanYi Micro Hei",
-            "PingFang SC",
-            "Source Han Sans SC",
-            "Arial Unicode MS",
-        ]
-        file_candidates = [
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-            "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-            "/usr/share/fonts/truetype/arphic/ukai.ttc",
-            "/usr/share/fonts/truetype/arphic/uming.ttc",
-            "/System/Library/Fonts/PingFang.ttc",
-            "/System/Library/Fonts/STHeiti Light.ttc",
-            "/Library/Fonts/Arial Unicode.ttf",
-            "C:\\Windows\\Fonts\\msyh.ttc",
-            "C:\\Windows\\Fonts\\simhei.ttf",
-        ]
-
-        selected_family = None
-
-        try:
-            for font_path in file_candidates:
-                if not os.path.exists(font_path):
-                    continue
-                fm.fontManager.addfont(font_path)
-                selected_family = fm.FontProperties(fname=font_path).get_name()
-                if selected_family:
-                    break
-
-            if not selected_family:
-                installed_families = {font.name for font in fm.fontManager.ttflist}
-                for family in family_candidates:
-                    if family in installed_families:
-                        selected_family = family
-                        break
-        except Exception:
-            selected_family = None
-
-        fallback_families = ["DejaVu Sans", "Arial", "sans-serif"]
-        if selected_family:
-            plt.rcParams["font.sans-serif"] = [selected_family] + fallback_families
-        else:
-            plt.rcParams["font.sans-serif"] = fallback_families
-
-        plt.rcParams["axes.unicode_minus"] = False
-        return selected_family
+        return _configure_matplotlib_font()
 
     def normalize_platform(self, platform: str) -> str:
         """标准化平台名称"""
@@ -175,7 +210,8 @@ class EnhancedReportGenerator:
         hospital_name: str,
         report_type: str = "special",
         report_period: str = None,
-        report_date_range: str = None
+        report_date_range: str = None,
+        include_charts: bool = True
     ) -> Dict[str, Any]:
         """
         生成增强版报告数据
@@ -186,6 +222,7 @@ class EnhancedReportGenerator:
         - report_type: 报告类型（special/quarterly/monthly）
         - report_period: 报告周期（如"2026Q1"）
         - report_date_range: 展示在报告封面的统计周期
+        - include_charts: 是否渲染图表图片（仅返回结构化数据时可跳过）
         """
         # 数据预处理
         df = self._preprocess_data(df)
@@ -215,7 +252,7 @@ class EnhancedReportGenerator:
         }
 
         # 生成图表
-        chart_paths = self.generate_charts(report_data, hospital_name)
+        chart_paths = self.generate_charts(report_data, hospital_name) if include_charts else {}
         report_data['chart_paths'] = chart_paths
 
         return report_data
@@ -278,9 +315,11 @@ class EnhancedReportGenerator:
     def _generate_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
         """生成报告摘要（增强版）"""
         total = len(df)
-        high_risk = len(df[df['严重程度'] == 'high'])
-        medium_risk = len(df[df['严重程度'] == 'medium'])
-        active = len(df[df['状态'] == 'active'])
+        # 一次 value_counts 得到各严重程度数量，避免逐个布尔筛选生成子表
+        severity_counts = df['严重程度'].value_counts()
+        high_risk = int(severity_counts.get('high', 0))
+        medium_risk = int(severity_counts.get('medium', 0))
+        active = int((df['状态'] == 'active').sum())
         avg_risk = df['风险分_数值'].mean()
 
         # 估算影响人数
@@ -293,7 +332,7 @@ class EnhancedReportGenerator:
         trend = self._analyze_trend(df)
 
         # 危险级别判断
-        danger_level = self._assess_danger_level(df)
+        danger_level = self._assess_danger_level(df, high_risk=high_risk, avg_risk=avg_risk)
 
         return {
             'total_events': total,
@@ -310,13 +349,17 @@ class EnhancedReportGenerator:
             'departments': df.get('科室', pd.Series()).nunique()
         }
 
-    def _assess_danger_level(self, df: pd.DataFrame) -> str:
-        """评估危险级别"""
+    def _assess_danger_level(
+        self, df: pd.DataFrame, high_risk: Optional[int] = None, avg_risk: Optional[float] = None
+    ) -> str:
+        """评估危险级别（调用方已统计过高危数量/平均风险分时可直接传入）"""
         if len(df) == 0:
             return "无风险"
 
-        high_risk = len(df[df['严重程度'] == 'high'])
-        avg_risk = df['风险分_数值'].mean()
+        if high_risk is None:
+            high_risk = int((df['严重程度'] == 'high').sum())
+        if avg_risk is None:
+            avg_risk = df['风险分_数值'].mean()
 
         if avg_risk >= 90 or high_risk >= 5:
             return "极高危险级别"
@@ -332,27 +375,25 @@ class EnhancedReportGenerator:
         if len(df) == 0:
             return "0"
 
-        total = 0
-        for _, row in df.iterrows():
-            platform = row.get('来源_标准', '')
-            severity = row.get('严重程度', 'low')
-
-            # 根据平台和严重程度估算
-            base_reach = 1000  # 默认1000人
+        platform = df.get('来源_标准', pd.Series('', index=df.index)).fillna('').astype(str)
+        severity = df.get('严重程度', pd.Series('low', index=df.index))
 
-            if '抖音' in platform:
-                base_reach = 100000  # 抖音10万
-            elif '微博' in platform:
-                base_reach = 50000  # 微博5万
-            elif '微信' in platform:
-                base_reach = 10000  # 微信1万
-
-            if severity == 'high':
-                base_reach *= 10
-            elif severity == 'medium':
-                base_reach *= 3
-
-            total += base_reach
+        # 根据平台和严重程度估算，默认1000人；抖音10万、微博5万、微信1万
+        base_reach = np.select(
+            [
+                platform.str.contains('抖音', regex=False).to_numpy(),
+                platform.str.contains('微博', regex=False).to_numpy(),
+                platform.str.contains('微信', regex=False).to_numpy(),
+            ],
+            [100000, 50000, 10000],
+            default=1000,
+        )
+        multiplier = np.select(
+            [(severity == 'high').to_numpy(), (severity == 'medium').to_numpy()],
+            [10, 3],
+            default=1,
+        )
+        total = int((base_reach * multiplier).sum())
 
         if total >= 100000000:
             return f"{round(total / 100000000, 1)}亿+"
@@ -464,7 +505,7 @@ class EnhancedReportGenerator:
         hourly_counts = df.groupby('小时').size()
 
         # 找出峰值时段
-        peak_hours = sorted(hourly_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        peak_hours = heapq.nlargest(5, hourly_counts.items(), key=itemgetter(1))
 
         # 检测时间模式
         time_pattern = self._detect_time_pattern(df)
@@ -580,22 +621,21 @@ class EnhancedReportGenerator:
 
     def _infer_event_types(self, df: pd.DataFrame) -> pd.Series:
         """从内容推断事件类型"""
-        types = []
-
-        for _, row in df.iterrows():
-            content = str(row.get('内容', '')) + str(row.get('标题', ''))
-
-            if any(keyword in content for keyword in ['死亡', '去世', '抢救无效', '手术死亡']):
-                types.append('医疗质量-死亡事件')
-            elif any(keyword in content for keyword in ['投诉', '态度差', '服务差']):
-                types.append('服务质量投诉')
-            elif any(keyword in content for keyword in ['费用', '收费', '贵']):
-                types.append('收费问题')
-            elif any(keyword in content for keyword in ['等待', '排队', '时间长']):
-                types.append('流程问题')
-            else:
-                types.append('其他')
-
+        if len(df) == 0:
+            return pd.Series([], dtype=object)
+
+        def _column_text(name: str) -> pd.Series:
+            if name in df.columns:
+                return df[name].astype(str)
+            return pd.Series('', index=df.index)
+
+        content = _column_text('内容') + _column_text('标题')
+        # 整列做关键词匹配，按优先级取第一个命中的类型
+        conditions = [
+            content.str.contains(pattern, regex=True).to_numpy()
+            for pattern, _ in _EVENT_TYPE_RULES
+        ]
+        types = np.select(conditions, [label for _, label in _EVENT_TYPE_RULES], default='其他')
         return pd.Series(types)
 
     def _get_type_severity(self, event_type: str) -> str:
@@ -891,14 +931,11 @@ class EnhancedReportGenerator:
             word_freq = Counter(words)
 
             # 过滤停用词
-            stop_words = {'的', '了', '是', '在', '我', '有', '和', '就', '不', '人',
-                         '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去',
-                         '你', '会', '着', '没有', '看', '好', '自己', '这', '但'}
+            filtered = [(k, v) for k, v in word_freq.items()
+                        if v > 1 and len(k) > 1 and k not in _KEYWORD_STOP_WORDS]
 
-            filtered = {k: v for k, v in word_freq.items()
-                       if len(k) > 1 and k not in stop_words and v > 1}
-
-            top_keywords = sorted(filtered.items(), key=lambda x: x[1], reverse=True)[:top_n]
+            # 只取前 top_n，无需对全部词频排序
+            top_keywords = heapq.nlargest(top_n, filtered, key=itemgetter(1))
 
             return [{'keyword': k, 'count': v} for k, v in top_keywords]
         else:
@@ -1185,10 +1222,10 @@ class EnhancedReportGenerator:
         if not api_key or not api_url or not model:
             return None
 
-        sample_df = df.copy()
-        if '风险分_数值' in sample_df.columns:
-            sample_df = sample_df.sort_values(by=['风险分_数值', '创建时间_解析'], ascending=[False, False], na_position='last')
-        sample_df = sample_df.head(25)
+        if '风险分_数值' in df.columns:
+            sample_df = self._top_rows_by_risk(df, 25)
+        else:
+            sample_df = df.head(25)
 
         lines = []
         for idx, row in enumerate(sample_df.itertuples(index=False), 1):
@@ -1559,6 +1596,14 @@ class EnhancedReportGenerator:
         lines.append("")
         return lines
 
+    @staticmethod
+    def _top_rows_by_risk(df: pd.DataFrame, n: int) -> pd.DataFrame:
+        """按风险分、时间倒序取前 n 条：nlargest 先选出候选（保留边界并列），只对候选排序"""
+        candidates = df.nlargest(n, '风险分_数值', keep='all')
+        return candidates.sort_values(
+            by=['风险分_数值', '创建时间_解析'], ascending=[False, False], na_position='last'
+        ).head(n)
+
     def _format_top_events_section(self, data: Dict[str, Any]) -> List[str]:
         lines = []
         df = data.get('raw_dataframe', pd.DataFrame())
@@ -1567,8 +1612,7 @@ class EnhancedReportGenerator:
         lines.append("## 六、重点事件 Top 10（按风险与时间排序）\n")
         work = df.copy()
         work['风险分_数值'] = pd.to_numeric(work.get('风险分_数值', 0), errors='coerce').fillna(0)
-        work = work.sort_values(by=['风险分_数值', '创建时间_解析'], ascending=[False, False], na_position='last')
-        topn = work.head(10)
+        topn = self._top_rows_by_risk(work, 10)
         lines.append("| 序号 | 标题 | 来源 | 风险分 | 关键判断 | 原文 |")
         lines.append("|---|---|---|---:|---|---|")
         for idx, row in enumerate(topn.itertuples(index=False), 1):
@@ -1736,8 +1780,7 @@ class EnhancedReportGenerator:
             # 图片
             if line.strip().startswith("!["):
                 # 提取图片路径 ![alt](path)
-                import re
-                match = re.match(r'!\[([^\]]*)\]\(([^\)]+)\)', line.strip())
+                match = _MD_IMAGE_RE.match(line.strip())
                 if match:
                     alt_text = match.group(1)
                     img_path = match.group(2)
@@ -1817,9 +1860,8 @@ class EnhancedReportGenerator:
 
     def _add_formatted_text(self, paragraph, text: str, bold: bool = False) -> None:
         """添加带格式的文本到段落（处理粗体等markdown格式）"""
-        import re
         # 处理粗体 **text**
-        parts = re.split(r'(\*\*[^\*]+\*\*)', text)
+        parts = _MD_BOLD_SPLIT_RE.split(text)
 
         for part in parts:
             if part.startswith('**') and part.endswith('**'):
@@ -2852,41 +2894,36 @@ class EnhancedReportGenerator:
         
         chart_paths = {}
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        # 1. 情感倾向饼图
-        sentiment_path = self._generate_sentiment_pie_chart(
-            report_data, 
-            os.path.join(self.charts_dir, f'sentiment_pie_{timestamp}.png')
-        )
-        if sentiment_path:
-            chart_paths['sentiment_pie'] = sentiment_path
-        
-        # 2. 问题类型饼图
-        category_path = self._generate_category_pie_chart(
-            report_data,
-            os.path.join(self.charts_dir, f'category_pie_{timestamp}.png')
-        )
-        if category_path:
-            chart_paths['category_pie'] = category_path
-        
-        # 3. 舆情热度趋势图
-        trend_path = self._generate_trend_line_chart(
-            report_data,
-            os.path.join(self.charts_dir, f'trend_line_{timestamp}.png')
-        )
-        if trend_path:
-            chart_paths['trend_line'] = trend_path
-        
-        # 4. 平台分布饼图
-        platform_path = self._generate_platform_pie_chart(
-            report_data,
-            os.path.join(self.charts_dir, f'platform_pie_{timestamp}.png')
-        )
-        if platform_path:
-            chart_paths['platform_pie'] = platform_path
-        
+
+        # 四张图复用同一个 Figure（不经过 pyplot 全局状态），依次渲染
+        chart_jobs = [
+            ('sentiment_pie', self._generate_sentiment_pie_chart, f'sentiment_pie_{timestamp}.png'),
+            ('category_pie', self._generate_category_pie_chart, f'category_pie_{timestamp}.png'),
+            ('trend_line', self._generate_trend_line_chart, f'trend_line_{timestamp}.png'),
+            ('platform_pie', self._generate_platform_pie_chart, f'platform_pie_{timestamp}.png'),
+        ]
+        with _CHART_LOCK:
+            for name, func, filename in chart_jobs:
+                path = func(report_data, os.path.join(self.charts_dir, filename))
+                if path:
+                    chart_paths[name] = path
+
         return chart_paths
 
+    @staticmethod
+    def _new_figure(figsize):
+        # 仅在持有 _CHART_LOCK 时调用
+        global _chart_figure
+        fig = _chart_figure
+        if fig is None:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            _chart_figure = fig
+        else:
+            fig.clear()
+            fig.set_size_inches(figsize)
+        return fig
+
     def _generate_sentiment_pie_chart(self, report_data: Dict[str, Any], output_path: str) -> str:
         """生成情感倾向饼图"""
         try:
@@ -2920,7 +2957,8 @@ class EnhancedReportGenerator:
                 return None
             
             # 创建图表
-            fig, ax = plt.subplots(figsize=(8, 6))
+            fig = self._new_figure((8, 6))
+            ax = fig.add_subplot()
             wedges, texts, autotexts = ax.pie(
                 sizes, 
                 labels=labels, 
@@ -2939,9 +2977,8 @@ class EnhancedReportGenerator:
                 autotext.set_fontweight('bold')
                 autotext.set_fontsize(11)
             
-            plt.tight_layout()
-            plt.savefig(output_path, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(output_path, dpi=150, bbox_inches='tight')
             
             return output_path
         except Exception as e:
@@ -2981,7 +3018,8 @@ class EnhancedReportGenerator:
                 colors.append(color_map.get(cat_name, '#999999'))
             
             # 创建图表
-            fig, ax = plt.subplots(figsize=(10, 7))
+            fig = self._new_figure((10, 7))
+            ax = fig.add_subplot()
             wedges, texts, autotexts = ax.pie(
                 sizes,
                 labels=labels,
@@ -3000,9 +3038,8 @@ class EnhancedReportGenerator:
                 autotext.set_fontweight('bold')
                 autotext.set_fontsize(10)
             
-            plt.tight_layout()
-            plt.savefig(output_path, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(output_path, dpi=150, bbox_inches='tight')
             
             return output_path
         except Exception as e:
@@ -3024,7 +3061,8 @@ class EnhancedReportGenerator:
             avg_risks = [item['avg_risk_score'] for item in trend_data]
             
             # 创建图表
-            fig, ax1 = plt.subplots(figsize=(12, 6))
+            fig = self._new_figure((12, 6))
+            ax1 = fig.add_subplot()
             
             # 左Y轴：舆情数量
             color1 = '#2196F3'
@@ -3044,19 +3082,20 @@ class EnhancedReportGenerator:
             ax2.tick_params(axis='y', labelcolor=color2)
             
             # 设置标题
-            plt.title('舆情热度趋势', fontsize=16, fontweight='bold', pad=20)
+            ax1.set_title('舆情热度趋势', fontsize=16, fontweight='bold', pad=20)
             
             # 旋转X轴标签
-            plt.xticks(rotation=45, ha='right')
+            for tick in ax1.get_xticklabels():
+                tick.set_rotation(45)
+                tick.set_ha('right')
             
             # 添加图例
             lines = line1 + line2
             labels = [l.get_label() for l in lines]
             ax1.legend(lines, labels, loc='upper left', fontsize=10)
             
-            plt.tight_layout()
-            plt.savefig(output_path, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(output_path, dpi=150, bbox_inches='tight')
             
             return output_path
         except Exception as e:
@@ -3084,7 +3123,8 @@ class EnhancedReportGenerator:
                 sizes.append(count)
             
             # 创建图表
-            fig, ax = plt.subplots(figsize=(9, 7))
+            fig = self._new_figure((9, 7))
+            ax = fig.add_subplot()
             wedges, texts, autotexts = ax.pie(
                 sizes,
                 labels=labels,
@@ -3103,9 +3143,8 @@ class EnhancedReportGenerator:
                 autotext.set_fontweight('bold')
                 autotext.set_fontsize(11)
             
-            plt.tight_layout()
-            plt.savefig(output_path, dpi=150, bbox_inches='tight')
-            plt.close()
+            fig.tight_layout()
+            fig.savefig(output_path, dpi=150, bbox_inches='tight')
             
             return output_path
         except Exception as e:
@@ -9,7 +9,8 @@ import db
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+import io
 import os
 import json
 import tempfile
@@ -22,6 +23,9 @@ except ImportError:
     WORDCLOUD_AVAILABLE = False
 
 
+# 严重程度 -> 风险分，未知等级按 low 计 30 分
+_RISK_SCORES = {'high': 100, 'medium': 60}
+
 _ENHANCED_GENERATOR_CLS = None
 
 
@@ -55,6 +59,7 @@ class MailCheckReportGenerator:
         self.project_root = os.path.dirname(current_dir)
         self.db_path = db_path
         self.conn = None
+        self._enhanced_generator = None
 
     def connect(self):
         """连接数据库"""
@@ -233,9 +238,7 @@ class MailCheckReportGenerator:
 
         # 添加风险分
         if '严重程度' in df.columns:
-            df['风险分'] = df['严重程度'].apply(
-                lambda x: 100 if x == 'high' else 60 if x == 'medium' else 30
-            )
+            df['风险分'] = df['严重程度'].map(_RISK_SCORES).fillna(30).astype('int64')
 
         if dedupe_by_event:
             df = self._dedupe_event_rows(df)
@@ -285,7 +288,7 @@ class MailCheckReportGenerator:
             end_date: 结束日期
             hospital: 医院名称
             report_period: 报告周期（如"2026年第一季度"）
-            output_format: 输出格式（markdown/word）
+            output_format: 输出格式（markdown/word/both/json，json 只返回结构化数据、不渲染图表和文件）
             include_dismissed: 是否包含已误报数据
             dedupe_by_event: 是否按事件归并去重
             sentiment_ids: 仅纳入指定舆情ID
@@ -317,8 +320,10 @@ class MailCheckReportGenerator:
 
         # 导入增强版report_generator
         try:
-            enhanced_cls = _load_enhanced_generator_cls()
-            gen = enhanced_cls()
+            if self._enhanced_generator is None:
+                # 增强版生成器初始化需扫描字体、读取AI配置，实例复用时只做一次
+                self._enhanced_generator = _load_enhanced_generator_cls()()
+            gen = self._enhanced_generator
         except ImportError:
             print("[ERROR] 无法导入EnhancedReportGenerator，请确保report_generator_enhanced.py在src目录下")
             return {
@@ -331,7 +336,7 @@ class MailCheckReportGenerator:
             output_format = 'markdown'
         elif output_format in ('docx',):
             output_format = 'word'
-        elif output_format not in ('markdown', 'word', 'both'):
+        elif output_format not in ('markdown', 'word', 'both', 'json'):
             output_format = 'markdown'
 
         # 确定医院名称
@@ -362,7 +367,8 @@ class MailCheckReportGenerator:
             hospital_name=hospital_name,
             report_type='special',
             report_period=report_period,
-            report_date_range=report_date_range
+            report_date_range=report_date_range,
+            include_charts=output_format != 'json'
         )
         report_data['data_scope'] = {
             'include_dismissed': include_dismissed,
@@ -380,12 +386,6 @@ class MailCheckReportGenerator:
         safe_hospital_name = ''.join(ch if ch.isalnum() or ch in ('-', '_') else '_' for ch in hospital_name)
         filename = f"{safe_hospital_name}_舆情报告_{timestamp}"
 
-        # 生成关键词云（可选）
-        wordcloud_name = self._generate_wordcloud(report_data, output_dir, filename)
-        if wordcloud_name:
-            report_data.setdefault('sentiment', {})['wordcloud_image'] = wordcloud_name
-        wordcloud_path = output_dir / wordcloud_name if wordcloud_name else None
-
         result = {
             'success': True,
             'hospital_name': hospital_name,
@@ -399,6 +399,20 @@ class MailCheckReportGenerator:
             'files': {}
         }
 
+        if output_format == 'json':
+            # 只返回结构化报告数据，由前端自行绘图，跳过词云、图表与文件生成
+            result['report'] = {
+                key: value for key, value in report_data.items()
+                if key not in ('raw_dataframe', 'chart_paths')
+            }
+            self.close()
+            return result
+
+        # 生成关键词云（可选）
+        wordcloud_name, wordcloud_png = self._generate_wordcloud(report_data, output_dir, filename)
+        if wordcloud_name:
+            report_data.setdefault('sentiment', {})['wordcloud_image'] = wordcloud_name
+
         # 先生成Markdown内容（Word将基于Markdown转换）
         md_content = gen.generate_markdown_report(report_data)
 
@@ -429,8 +443,8 @@ class MailCheckReportGenerator:
                 md_for_docx = temp_md_path
 
             self._convert_markdown_to_docx(md_for_docx, str(docx_path))
-            if wordcloud_path and wordcloud_path.exists():
-                self._embed_wordcloud_in_docx(str(docx_path), str(wordcloud_path))
+            if wordcloud_png:
+                self._embed_wordcloud_in_docx(str(docx_path), wordcloud_png)
             result['files']['word'] = str(docx_path)
             print(f"[OK] Word报告: {docx_path}")
 
@@ -471,21 +485,23 @@ class MailCheckReportGenerator:
                 return path
         return None
 
-    def _generate_wordcloud(self, report_data: Dict[str, Any], output_dir: Path, filename: str) -> Optional[str]:
-        """根据关键词生成词云图片，返回相对文件名"""
+    def _generate_wordcloud(
+        self, report_data: Dict[str, Any], output_dir: Path, filename: str
+    ) -> Tuple[Optional[str], Optional[bytes]]:
+        """根据关键词生成词云图片，返回相对文件名和PNG内容（供Word直接嵌入，无需再读盘）"""
         if not WORDCLOUD_AVAILABLE:
             print("[WARN] 未安装wordcloud，跳过关键词云生成")
-            return None
+            return None, None
 
         sentiment = report_data.get('sentiment', {})
         keywords = sentiment.get('top_keywords', [])
         if not keywords:
-            return None
+            return None, None
 
         font_path = self._find_chinese_font()
         if not font_path:
             print("[WARN] 未找到中文字体，跳过关键词云生成")
-            return None
+            return None, None
 
         freqs: Dict[str, int] = {}
         for item in keywords:
@@ -506,7 +522,7 @@ class MailCheckReportGenerator:
             freqs[key_text] = int(count) if count else 1
 
         if not freqs:
-            return None
+            return None, None
 
         wc = WordCloud(
             font_path=font_path,
@@ -518,10 +534,15 @@ class MailCheckReportGenerator:
         )
         wc.generate_from_frequencies(freqs)
 
+        # 只编码一次PNG：同一份字节既写入文件（Markdown引用），也用于Word嵌入
+        buffer = io.BytesIO()
+        wc.to_image().save(buffer, format='PNG', optimize=True)
+        png_bytes = buffer.getvalue()
+
         image_name = f"{filename}_wordcloud.png"
         image_path = output_dir / image_name
-        wc.to_file(str(image_path))
-        return image_name
+        image_path.write_bytes(png_bytes)
+        return image_name, png_bytes
 
     def _convert_markdown_to_docx(self, md_path: str, docx_path: str) -> None:
         """将Markdown转换为Word（优先pypandoc，其次调用pandoc命令）"""
@@ -543,7 +564,7 @@ class MailCheckReportGenerator:
         except subprocess.CalledProcessError as exc:
             raise RuntimeError(f"pandoc转换失败: {exc}") from exc
 
-    def _embed_wordcloud_in_docx(self, docx_path: str, image_path: str) -> None:
+    def _embed_wordcloud_in_docx(self, docx_path: str, image_png: bytes) -> None:
         """将关键词云图片插入到Word文档中"""
         try:
             from docx import Document
@@ -571,14 +592,23 @@ class MailCheckReportGenerator:
 
         if target:
             pic_par = _insert_paragraph_after(target)
-            pic_par.add_run().add_picture(image_path, width=Inches(5.5))
+            pic_par.add_run().add_picture(io.BytesIO(image_png), width=Inches(5.5))
         else:
             doc.add_heading("关键词云图", level=3)
-            doc.add_picture(image_path, width=Inches(5.5))
+            doc.add_picture(io.BytesIO(image_png), width=Inches(5.5))
 
         doc.save(docx_path)
 
 
+def run_report_task(params: Dict[str, Any]) -> Dict[str, Any]:
+    """后台任务入口（RQ worker 调用）：独立进程内生成一次报告。"""
+    generator = MailCheckReportGenerator()
+    try:
+        return generator.generate_report(**params)
+    finally:
+        generator.close()
+
+
 def main():
     """命令行入口"""
     import argparse